@@ -121,25 +121,24 @@ IMPORTANT:
             result = self.tag_file(filename, content, extension)
             
             if result['summary'] or result['tags']:
-                # Update database
-                cursor.execute("""
-                    UPDATE files
-                    SET ai_summary = ?, ai_tags = ?, project = ?
-                    WHERE id = ?
-                """, (
-                    result['summary'],
-                    ','.join(result['tags']),
-                    result['project'],
-                    file_id
-                ))
-                
-                # Add individual tags
-                cursor.execute("DELETE FROM tags WHERE file_id = ?", (file_id,))
-                for tag in result['tags']:
-                    cursor.execute("INSERT INTO tags (file_id, tag) VALUES (?, ?)", 
-                                 (file_id, tag.lower()))
-                
-                db.conn.commit()
+                with db.write() as conn:
+                    # Update database
+                    conn.execute("""
+                        UPDATE files
+                        SET ai_summary = ?, ai_tags = ?, project = ?
+                        WHERE id = ?
+                    """, (
+                        result['summary'],
+                        ','.join(result['tags']),
+                        result['project'],
+                        file_id
+                    ))
+                    
+                    # Add individual tags
+                    conn.execute("DELETE FROM tags WHERE file_id = ?", (file_id,))
+                    for tag in result['tags']:
+                        conn.execute("INSERT INTO tags (file_id, tag) VALUES (?, ?)", 
+                                     (file_id, tag.lower()))
                 tagged_count += 1
         
         return tagged_count
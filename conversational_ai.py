@@ -5,6 +5,7 @@ Handles intelligent conversations with learning and context management
 """
 
 import ollama
+import os
 import json
 import re
 from datetime import datetime, timedelta
@@ -266,124 +267,84 @@ NOW RESPOND TO THE USER'S ACTUAL MESSAGE:
     
     def learn_from_interaction(self, user_message, intent, action_taken, success):
         """Learn patterns from successful interactions"""
+        patterns = []
         
         # Learn search patterns
         if intent == 'SEARCH' and success:
             search_terms = self.extract_search_terms(user_message)
             if search_terms:
-                self.file_db.learn_pattern(
+                patterns.append((
                     'search_terms',
                     search_terms,
                     action_taken or '',
-                    confidence=0.7 if success else 0.3
-                )
+                    0.7 if success else 0.3
+                ))
         
         # Learn organizational preferences
         if intent == 'ORGANIZE' and action_taken:
             if 'by project' in action_taken.lower():
-                self.file_db.learn_pattern(
-                    'organization_style',
-                    'prefers_by_project',
-                    'true',
-                    confidence=0.8
-                )
+                patterns.append(('organization_style', 'prefers_by_project', 'true', 0.8))
             elif 'by type' in action_taken.lower():
-                self.file_db.learn_pattern(
-                    'organization_style',
-                    'prefers_by_type',
-                    'true',
-                    confidence=0.8
-                )
+                patterns.append(('organization_style', 'prefers_by_type', 'true', 0.8))
         
         # Learn common task patterns
         if intent in ['SEARCH', 'ORGANIZE', 'INFO']:
-            self.file_db.learn_pattern(
+            patterns.append((
                 'common_tasks',
                 intent.lower(),
                 user_message[:100],  # Store snippet of request
-                confidence=0.6
-            )
+                0.6
+            ))
+        
+        self.file_db.learn_patterns(patterns)
     
     def extract_and_remember_facts(self, user_message):
         """Extract personal facts and context from user messages"""
         message_lower = user_message.lower()
+        patterns = []
         
         # Detect work/role information
         work_phrases = ['i work', 'i\'m a', 'i am a', 'my job', 'i do', 'my role']
-        for phrase in work_phrases:
-            if phrase in message_lower:
-                # Store the context
-                self.file_db.learn_pattern(
-                    'user_facts',
-                    'work_context',
-                    user_message,
-                    confidence=0.9
-                )
-                break
+        if any(phrase in message_lower for phrase in work_phrases):
+            # Store the context
+            patterns.append(('user_facts', 'work_context', user_message, 0.9))
         
         # Detect project mentions with context
         project_phrases = ['working on', 'project called', 'client is', 'for my', 'building', 'creating']
-        for phrase in project_phrases:
-            if phrase in message_lower:
-                self.file_db.learn_pattern(
-                    'user_facts',
-                    'project_context',
-                    user_message,
-                    confidence=0.8
-                )
-                break
+        if any(phrase in message_lower for phrase in project_phrases):
+            patterns.append(('user_facts', 'project_context', user_message, 0.8))
         
         # Detect file habits/preferences
         habit_phrases = ['i usually', 'i always', 'i typically', 'i tend to', 'i like to', 'i prefer']
-        for phrase in habit_phrases:
-            if phrase in message_lower:
-                self.file_db.learn_pattern(
-                    'user_facts',
-                    'file_habits',
-                    user_message,
-                    confidence=0.8
-                )
-                break
+        if any(phrase in message_lower for phrase in habit_phrases):
+            patterns.append(('user_facts', 'file_habits', user_message, 0.8))
         
         # Detect tool/app mentions
         tool_keywords = ['use', 'using', 'with', 'in', 'from']
         apps = ['notion', 'figma', 'photoshop', 'illustrator', 'sketch', 'vscode', 'xcode', 
                 'slack', 'discord', 'zoom', 'teams', 'chrome', 'safari', 'firefox']
-        for app in apps:
-            if app in message_lower:
-                for keyword in tool_keywords:
-                    if keyword in message_lower:
-                        self.file_db.learn_pattern(
-                            'user_facts',
-                            'tools_used',
-                            f"Uses {app}: {user_message[:100]}",
-                            confidence=0.7
-                        )
-                        break
+        if any(keyword in message_lower for keyword in tool_keywords):
+            for app in apps:
+                if app in message_lower:
+                    patterns.append((
+                        'user_facts',
+                        'tools_used',
+                        f"Uses {app}: {user_message[:100]}",
+                        0.7
+                    ))
         
         # Detect personal preferences
         preference_phrases = ['i hate', 'i love', 'i don\'t like', 'drives me crazy', 'bothers me']
-        for phrase in preference_phrases:
-            if phrase in message_lower:
-                self.file_db.learn_pattern(
-                    'user_facts',
-                    'preferences',
-                    user_message,
-                    confidence=0.9
-                )
-                break
+        if any(phrase in message_lower for phrase in preference_phrases):
+            patterns.append(('user_facts', 'preferences', user_message, 0.9))
         
         # Detect specific file/folder mentions with importance
         importance_phrases = ['important', 'critical', 'need to find', 'can\'t lose', 'must have']
-        for phrase in importance_phrases:
-            if phrase in message_lower:
-                self.file_db.learn_pattern(
-                    'user_facts',
-                    'important_files',
-                    user_message,
-                    confidence=0.9
-                )
-                break
+        if any(phrase in message_lower for phrase in importance_phrases):
+            patterns.append(('user_facts', 'important_files', user_message, 0.9))
+        
+        # One statement and commit for everything this message taught us
+        self.file_db.learn_patterns(patterns)
     
     async def chat_async(self, user_message, conversation_history):
         """Async chat with enhanced intelligence"""
@@ -398,8 +359,8 @@ NOW RESPOND TO THE USER'S ACTUAL MESSAGE:
         
         # Prepare messages with enhanced context
         messages = [
-            {"role": "system", "content": enhanced_prompt}
-        ] + conversation_history + [
+            {"role": "system", "content": enhanced_prompt},
+            *conversation_history,
             {"role": "user", "content": user_message}
         ]
         
@@ -449,6 +410,35 @@ NOW RESPOND TO THE USER'S ACTUAL MESSAGE:
             'action': action_taken
         }
     
+    def build_file_context(self, paths):
+        """Describe files the user dragged into the chat, from the database"""
+        known = self.file_db.get_files_by_path(paths)
+        parts = []
+        
+        for file_path in paths:
+            info = known.get(file_path)
+            
+            if info:
+                parts.append(f"- {info['filename']}\n")
+                parts.append(f"  Path: {file_path}\n")
+                if info['ai_summary']:
+                    parts.append(f"  Summary: {info['ai_summary']}\n")
+                if info['ai_tags']:
+                    parts.append(f"  Tags: {info['ai_tags']}\n")
+                if info['project']:
+                    parts.append(f"  Project: {info['project']}\n")
+                parts.append(f"  Location: {info['folder_location']}\n")
+                parts.append(f"  Modified: {info['modified_date']}\n")
+            else:
+                # File not in database yet
+                parts.append(f"- {os.path.basename(file_path)}\n")
+                parts.append(f"  Path: {file_path}\n")
+                parts.append("  (Not yet indexed - run a scan to analyze this file)\n")
+            
+            parts.append("\n")
+        
+        return "".join(parts)
+    
     def handle_temporal_query(self, message):
         """Handle temporal queries directly without calling Ollama"""
         results, start_time, end_time = self.temporal_tracker.query_files_by_time(message)
@@ -495,8 +485,8 @@ NOW RESPOND TO THE USER'S ACTUAL MESSAGE:
         # Format as range
         return f"{start.strftime('%b %d')} to {end.strftime('%b %d')}"
     
-    def chat(self, user_message, conversation_history):
-        """Synchronous version of chat"""
+    def chat(self, user_message, conversation_history, on_token=None):
+        """Synchronous version of chat (on_token, if given, gets each reply token as it streams in)"""
         # Detect intent
         intent = self.detect_intent(user_message)
         
@@ -524,18 +514,26 @@ NOW RESPOND TO THE USER'S ACTUAL MESSAGE:
         
         # Prepare messages with enhanced context
         messages = [
-            {"role": "system", "content": enhanced_prompt}
-        ] + conversation_history + [
+            {"role": "system", "content": enhanced_prompt},
+            *conversation_history,
             {"role": "user", "content": user_message}
         ]
         
         # Call Ollama
-        response = ollama.chat(
-            model=self.model,
-            messages=messages
-        )
-        
-        assistant_response = response['message']['content']
+        if on_token:
+            parts = []
+            for chunk in ollama.chat(model=self.model, messages=messages, stream=True):
+                token = chunk['message']['content']
+                parts.append(token)
+                on_token(token)
+            assistant_response = ''.join(parts)
+        else:
+            response = ollama.chat(
+                model=self.model,
+                messages=messages
+            )
+            
+            assistant_response = response['message']['content']
         
         # Parse structured tags from response
         extracted_intent = intent
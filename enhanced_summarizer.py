@@ -5,9 +5,13 @@ Multi-page PDFs, video/audio transcription, advanced summarization
 """
 
 import os
+import re
 import json
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
+from collections import Counter
 
 # PDF processing
 try:
@@ -19,6 +23,7 @@ except ImportError:
 # Optional: Advanced summarization
 try:
     from openai import OpenAI
+    import httpx  # Installed with openai; used for connection pooling
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -30,6 +35,26 @@ try:
 except ImportError:
     OLLAMA_AVAILABLE = False
 
+# Optional: Vectorized sentence scoring for the local backend
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Sentence and word tokenizers for local extractive summarization
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+WORD_RE = re.compile(r"[a-z0-9']+")
+TOPIC_RE = re.compile(r"[a-z]{4,}")
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of',
+    'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'it', 'its', 'this',
+    'that', 'these', 'those', 'as', 'from', 'not', 'can', 'will', 'has', 'have',
+    'had', 'they', 'their', 'we', 'our', 'you', 'your', 'he', 'she', 'his', 'her'
+})
+
 
 class EnhancedSummarizer:
     """Advanced content summarization with multiple backends"""
@@ -58,7 +83,15 @@ class EnhancedSummarizer:
             api_key = os.getenv('OPENAI_API_KEY')
             if not api_key:
                 raise ValueError("OPENAI_API_KEY not set")
-            self.client = OpenAI(api_key=api_key)
+            # Keep connections alive across calls so batch runs don't pay a
+            # TLS handshake per chunk
+            self.client = OpenAI(
+                api_key=api_key,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=64),
+                    timeout=60.0
+                )
+            )
         
         elif backend == 'local':
             self.model = 'local'
@@ -94,34 +127,49 @@ class EnhancedSummarizer:
                 total_pages = len(pdf.pages)
                 pages_to_process = min(total_pages, max_pages) if max_pages else total_pages
                 
-                # Extract text in chunks
-                chunks = []
-                for i in range(0, pages_to_process, chunk_size):
-                    chunk_text = ""
-                    for page_num in range(i, min(i + chunk_size, pages_to_process)):
-                        chunk_text += pdf.pages[page_num].extract_text() + "\n\n"
-                    
-                    if chunk_text.strip():
-                        chunks.append({
-                            'pages': f"{i+1}-{min(i+chunk_size, pages_to_process)}",
-                            'text': chunk_text[:5000]  # Limit chunk size
-                        })
+                # Extract chunks on a background thread while the previous
+                # chunk is being summarized; the bounded queue keeps
+                # extraction from running far ahead of the backend
+                chunk_queue = queue.Queue(maxsize=4)
+                stop = threading.Event()
+                producer = threading.Thread(
+                    target=self._extract_pdf_chunks,
+                    args=(pdf, pages_to_process, chunk_size, chunk_queue, stop),
+                    daemon=True
+                )
+                producer.start()
                 
-                # Summarize each chunk
+                # Summarize each chunk as it arrives (in page order)
                 chunk_summaries = []
-                for chunk in chunks:
-                    summary = self._summarize_text(chunk['text'])
-                    chunk_summaries.append({
-                        'pages': chunk['pages'],
-                        'summary': summary
-                    })
+                try:
+                    while True:
+                        chunk = chunk_queue.get()
+                        if chunk is None:
+                            break
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        
+                        summary = self._summarize_text(chunk['text'])
+                        chunk_summaries.append({
+                            'pages': chunk['pages'],
+                            'summary': summary
+                        })
+                finally:
+                    # Unblock the producer if we stopped early, and make sure
+                    # it's done with the file before it gets closed
+                    stop.set()
+                    while producer.is_alive():
+                        try:
+                            chunk_queue.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
                 
-                # Create overall summary
-                combined_text = "\n\n".join([cs['summary'] for cs in chunk_summaries])
-                overall_summary = self._summarize_text(
-                    f"Create a comprehensive summary from these section summaries:\n\n{combined_text}",
-                    max_length=500
-                )
+                # Create overall summary (a single chunk's summary already is one)
+                if len(chunk_summaries) <= 1:
+                    overall_summary = chunk_summaries[0]['summary'] if chunk_summaries else ""
+                else:
+                    combined_text = "\n\n".join([cs['summary'] for cs in chunk_summaries])
+                    overall_summary = self._summarize_text(combined_text, max_length=500)
                 
                 # Extract key topics
                 key_topics = self._extract_topics(overall_summary)
@@ -129,7 +177,7 @@ class EnhancedSummarizer:
                 return {
                     'summary': overall_summary,
                     'page_count': total_pages,
-                    'chunks_processed': len(chunks),
+                    'chunks_processed': len(chunk_summaries),
                     'chunk_summaries': chunk_summaries,
                     'key_topics': key_topics,
                     'metadata': {
@@ -143,6 +191,27 @@ class EnhancedSummarizer:
         except Exception as e:
             return {'error': str(e)}
     
+    def _extract_pdf_chunks(self, pdf, pages_to_process, chunk_size, chunk_queue, stop):
+        """Producer for summarize_pdf: queue text chunks, then None when done"""
+        try:
+            for i in range(0, pages_to_process, chunk_size):
+                if stop.is_set():
+                    break
+                
+                chunk_text = ""
+                for page_num in range(i, min(i + chunk_size, pages_to_process)):
+                    chunk_text += pdf.pages[page_num].extract_text() + "\n\n"
+                
+                if chunk_text.strip():
+                    chunk_queue.put({
+                        'pages': f"{i+1}-{min(i+chunk_size, pages_to_process)}",
+                        'text': chunk_text[:5000]  # Limit chunk size
+                    })
+        except Exception as e:
+            chunk_queue.put(e)
+        finally:
+            chunk_queue.put(None)
+    
     def _summarize_text(self, text, max_length=200):
         """Summarize text using configured backend"""
         
@@ -187,7 +256,13 @@ class EnhancedSummarizer:
             return f"Error: {e}"
     
     def _summarize_local(self, text, max_length):
-        """Simple extractive summarization (no external dependencies)"""
+        """Extractive summarization: TF-IDF sentence scoring with NumPy"""
+        if NUMPY_AVAILABLE:
+            sentences = [s.strip() for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
+            if len(sentences) > 1:
+                return self._summarize_tfidf(sentences, max_length)
+        
+        # Fallback: first few sentences (no external dependencies)
         sentences = text.split('.')
         # Take first few sentences up to max_length words
         summary = []
@@ -203,21 +278,53 @@ class EnhancedSummarizer:
         
         return '. '.join(summary) + '.' if summary else text[:max_length*5]
     
+    def _summarize_tfidf(self, sentences, max_length):
+        """Pick the sentences closest to the document's TF-IDF centroid"""
+        tokenized = [
+            [w for w in WORD_RE.findall(sentence.lower()) if w not in STOP_WORDS]
+            for sentence in sentences
+        ]
+        vocab = {}
+        rows, cols = [], []
+        for i, words in enumerate(tokenized):
+            for word in words:
+                rows.append(i)
+                cols.append(vocab.setdefault(word, len(vocab)))
+        
+        if not vocab:
+            return ' '.join(sentences)[:max_length*5]
+        
+        # Term counts -> smoothed TF-IDF, rows L2-normalized
+        matrix = np.zeros((len(sentences), len(vocab)))
+        np.add.at(matrix, (rows, cols), 1.0)
+        doc_freq = np.count_nonzero(matrix, axis=0)
+        matrix *= np.log((1 + len(sentences)) / (1 + doc_freq)) + 1
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        
+        scores = matrix @ matrix.mean(axis=0)
+        
+        # Greedily take the best sentences that fit, then restore text order
+        chosen = []
+        word_count = 0
+        for i in np.argsort(-scores, kind='stable'):
+            length = len(sentences[i].split())
+            if word_count + length <= max_length:
+                chosen.append(i)
+                word_count += length
+        
+        if not chosen:
+            return sentences[int(np.argmax(scores))][:max_length*5]
+        
+        return ' '.join(sentences[i] for i in sorted(chosen))
+    
     def _extract_topics(self, text):
         """Extract key topics from summary"""
-        # Simple keyword extraction
-        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        words = text.lower().split()
-        word_freq = {}
-        
-        for word in words:
-            word = word.strip('.,!?;:()[]{}"\'-')
-            if len(word) > 3 and word not in common_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
+        # Simple keyword extraction: 4+ letter words, minus stop words
+        words = Counter(w for w in TOPIC_RE.findall(text.lower()) if w not in STOP_WORDS)
         
         # Return top 5 topics
-        sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        return [word for word, freq in sorted_words[:5]]
+        return [word for word, freq in words.most_common(5)]
     
     def summarize_video_transcript(self, transcript_text, title=None):
         """
@@ -263,7 +370,25 @@ class EnhancedSummarizer:
         
         return key_points
     
-    def batch_summarize_folder(self, folder_path, file_types=['.pdf'], max_files=None, callback=None):
+    def _load_checkpoint(self, output_jsonl):
+        """Return paths already summarized successfully in a JSONL checkpoint"""
+        done = set()
+        if not os.path.exists(output_jsonl):
+            return done
+        
+        with open(output_jsonl, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Partial last line from an interrupted run
+                    continue
+                if 'error' not in record and record.get('file'):
+                    done.add(record['file'])
+        return done
+    
+    def batch_summarize_folder(self, folder_path, file_types=['.pdf'], max_files=None, callback=None,
+                               output_jsonl=None):
         """
         Batch summarize all files in a folder
         
@@ -272,54 +397,83 @@ class EnhancedSummarizer:
             file_types: List of extensions to process
             max_files: Maximum files to process
             callback: Progress callback(current, total, file_name)
+            output_jsonl: Optional checkpoint file. Each result is appended
+                and fsynced as soon as it's ready, and files already
+                summarized there are skipped, so an interrupted run resumes
+                where it stopped. Failed files are retried.
         
         Returns:
-            List of summaries with file info
+            List of summaries with file info (for files processed this run),
+            or with output_jsonl, counts of this run's summarized and failed
+            files (the results themselves are only kept in the file)
         """
-        results = []
+        results = None if output_jsonl else []
+        summarized = failed = 0
         files = []
+        done = self._load_checkpoint(output_jsonl) if output_jsonl else set()
         
-        # Collect files
+        # Collect files (str.endswith accepts a tuple and matches in C)
+        extensions = tuple(ext.lower() for ext in file_types)
         for root, dirs, filenames in os.walk(folder_path):
             for filename in filenames:
-                if any(filename.lower().endswith(ext) for ext in file_types):
-                    files.append(os.path.join(root, filename))
+                if filename.lower().endswith(extensions):
+                    file_path = os.path.join(root, filename)
+                    if file_path not in done:
+                        files.append(file_path)
         
         # Limit if requested
         if max_files:
             files = files[:max_files]
         
         total = len(files)
+        checkpoint = open(output_jsonl, 'a', encoding='utf-8') if output_jsonl else None
         
-        # Process each file
-        for i, file_path in enumerate(files, 1):
-            try:
-                if callback:
-                    callback(i, total, os.path.basename(file_path))
+        try:
+            # Process each file
+            for i, file_path in enumerate(files, 1):
+                try:
+                    if callback:
+                        callback(i, total, os.path.basename(file_path))
+                    
+                    # Summarize based on type
+                    if file_path.lower().endswith('.pdf'):
+                        result = self.summarize_pdf(file_path, max_pages=20)
+                    else:
+                        # For other types, read as text (first 10k chars only)
+                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                            text = f.read(10000)
+                        result = {
+                            'summary': self._summarize_text(text),
+                            'topics': self._extract_topics(text)
+                        }
+                    
+                    result['file'] = file_path
+                    result['filename'] = os.path.basename(file_path)
                 
-                # Summarize based on type
-                if file_path.lower().endswith('.pdf'):
-                    result = self.summarize_pdf(file_path, max_pages=20)
-                else:
-                    # For other types, read as text
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        text = f.read()[:10000]
+                except Exception as e:
                     result = {
-                        'summary': self._summarize_text(text),
-                        'topics': self._extract_topics(text)
+                        'file': file_path,
+                        'filename': os.path.basename(file_path),
+                        'error': str(e)
                     }
                 
-                result['file'] = file_path
-                result['filename'] = os.path.basename(file_path)
-                results.append(result)
-            
-            except Exception as e:
-                results.append({
-                    'file': file_path,
-                    'filename': os.path.basename(file_path),
-                    'error': str(e)
-                })
+                if 'error' in result:
+                    failed += 1
+                else:
+                    summarized += 1
+                
+                if checkpoint:
+                    checkpoint.write(json.dumps(result) + "\n")
+                    checkpoint.flush()
+                    os.fsync(checkpoint.fileno())
+                else:
+                    results.append(result)
+        finally:
+            if checkpoint:
+                checkpoint.close()
         
+        if output_jsonl:
+            return {'summarized': summarized, 'failed': failed, 'output_jsonl': output_jsonl}
         return results
     
     def get_backend_info(self):
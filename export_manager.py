@@ -6,24 +6,157 @@ Supports multiple formats: JSON, CSV, HTML, Markdown
 
 import json
 import csv
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 import os
 
 
+# Same replacements as html.escape(quote=True), applied in one C-level pass
+_HTML_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#x27;',
+})
+
+
+def _escape_html(value):
+    """Escape a database value for safe embedding in HTML"""
+    return str(value).translate(_HTML_ESCAPE_TABLE)
+
+
+# Columns fetched once per export run (content_text is opt-in, it's large)
+_EXPORT_COLUMNS = [
+    'id', 'path', 'filename', 'extension', 'size',
+    'created_date', 'modified_date', 'last_indexed',
+    'mime_type', 'folder_location',
+    'ai_summary', 'ai_tags', 'project', 'status',
+    'access_count', 'last_accessed'
+]
+
+# Row layout used by the CSV and HTML writers
+_TABLE_ROW = itemgetter(
+    'filename', 'extension', 'size', 'modified_date',
+    'folder_location', 'ai_summary', 'ai_tags', 'project',
+    'access_count', 'path'
+)
+
+# Row layout used by the Markdown writer
+_MARKDOWN_ROW = itemgetter(
+    'filename', 'extension', 'folder_location',
+    'ai_summary', 'ai_tags', 'project', 'modified_date'
+)
+
+# Markdown sections: files without a project go under "Uncategorized",
+# sorted with the named projects (same grouping in SQL and Python)
+_MARKDOWN_ORDER = "COALESCE(NULLIF(project, ''), 'Uncategorized'), filename"
+
+
+def _project_label(file_data):
+    """Markdown section a file belongs to"""
+    return file_data['project'] or "Uncategorized"
+
+
 class ExportManager:
     """Exports file database to various formats"""
     
     def __init__(self, file_db):
         self.file_db = file_db
+        # Stats snapshot shared by every writer during export_all_formats
+        self._stats = None
+        # Dedicated read-only connection, opened on first export
+        self._read_conn = None
+    
+    def _reader(self):
+        """Read-only connection for export queries (falls back to the main one)"""
+        if self._read_conn is not None:
+            return self._read_conn
+        
+        db_path = getattr(self.file_db, 'db_path', None)
+        if not db_path or db_path == ':memory:':
+            return self.file_db.conn
+        
+        try:
+            uri = Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+            self._read_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._read_conn.execute("PRAGMA query_only=1")
+        except sqlite3.Error as e:
+            print(f"Note: Using main connection for export: {e}")
+            return self.file_db.conn
+        
+        return self._read_conn
     
-    def export_to_json(self, output_path=None, include_content=False):
+    def close(self):
+        """Close the export read connection"""
+        if self._read_conn:
+            self._read_conn.close()
+            self._read_conn = None
+    
+    def _get_stats(self):
+        """Return the stats snapshot for the current export run"""
+        if self._stats is not None:
+            return self._stats
+        return self.file_db.get_stats()
+    
+    def _fetch_files(self, include_content=False, include_tags=True, order_by="filename"):
+        """
+        Fetch all active files as dicts, ordered by filename (or order_by)
+        
+        Tags come from one pass over the tags table instead of a query per
+        file, so the result can be handed to every writer in a single run.
+        """
+        columns = list(_EXPORT_COLUMNS)
+        if include_content:
+            columns.insert(columns.index('folder_location') + 1, 'content_text')
+        
+        conn = self._reader()
+        snapshot = conn is not self.file_db.conn
+        cursor = conn.cursor()
+        
+        # Read files and tags from one snapshot on the read-only connection.
+        # The SQL text is identical between runs, so sqlite3's statement
+        # cache reuses the prepared statement.
+        if snapshot:
+            cursor.execute("BEGIN")
+        try:
+            cursor.execute(f"""
+                SELECT {', '.join(columns)}
+                FROM files WHERE status = 'active'
+                ORDER BY {order_by}
+            """)
+            files = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            
+            if include_tags:
+                by_id = {}
+                for file_data in files:
+                    file_data['tags_list'] = []
+                    by_id[file_data['id']] = file_data['tags_list']
+                
+                cursor.execute("SELECT file_id, tag FROM tags ORDER BY id")
+                for file_id, tag in cursor:
+                    tags_list = by_id.get(file_id)
+                    if tags_list is not None:
+                        tags_list.append(tag)
+        finally:
+            if snapshot:
+                conn.rollback()
+        
+        return files
+    
+    def export_to_json(self, output_path=None, include_content=False, files=None, patterns=None):
         """
         Export complete index to JSON
         
         Args:
             output_path: Where to save (default: ~/.fileorganizer/exports/)
             include_content: Include full file content (makes file large)
+            files: Pre-fetched rows from _fetch_files (fetched if omitted)
+            patterns: Pre-fetched learned patterns (fetched if omitted)
         """
         if output_path is None:
             export_dir = os.path.expanduser("~/.fileorganizer/exports")
@@ -31,49 +164,15 @@ class ExportManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = os.path.join(export_dir, f"file_index_{timestamp}.json")
         
-        cursor = self.file_db.conn.cursor()
-        
-        # Build query based on whether to include content
-        if include_content:
-            query = """
-                SELECT id, path, filename, extension, size, 
-                       created_date, modified_date, last_indexed,
-                       mime_type, folder_location, content_text,
-                       ai_summary, ai_tags, project, status,
-                       access_count, last_accessed
-                FROM files WHERE status = 'active'
-                ORDER BY filename
-            """
-        else:
-            query = """
-                SELECT id, path, filename, extension, size, 
-                       created_date, modified_date, last_indexed,
-                       mime_type, folder_location,
-                       ai_summary, ai_tags, project, status,
-                       access_count, last_accessed
-                FROM files WHERE status = 'active'
-                ORDER BY filename
-            """
-        
-        cursor.execute(query)
-        
-        columns = [desc[0] for desc in cursor.description]
-        files = []
-        
-        for row in cursor.fetchall():
-            file_data = dict(zip(columns, row))
-            
-            # Get tags for this file
-            cursor.execute("SELECT tag FROM tags WHERE file_id = ?", (file_data['id'],))
-            file_data['tags_list'] = [tag[0] for tag in cursor.fetchall()]
-            
-            files.append(file_data)
+        if files is None:
+            files = self._fetch_files(include_content=include_content)
         
         # Get statistics
-        stats = self.file_db.get_stats()
+        stats = self._get_stats()
         
         # Get learned patterns
-        patterns = self.file_db.get_learned_patterns()
+        if patterns is None:
+            patterns = self.file_db.get_learned_patterns()
         
         export_data = {
             'metadata': {
@@ -93,7 +192,7 @@ class ExportManager:
         
         return output_path, len(files)
     
-    def export_to_csv(self, output_path=None):
+    def export_to_csv(self, output_path=None, files=None):
         """Export to CSV format (spreadsheet-friendly)"""
         if output_path is None:
             export_dir = os.path.expanduser("~/.fileorganizer/exports")
@@ -101,14 +200,8 @@ class ExportManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = os.path.join(export_dir, f"file_index_{timestamp}.csv")
         
-        cursor = self.file_db.conn.cursor()
-        cursor.execute("""
-            SELECT filename, extension, size, modified_date, 
-                   folder_location, ai_summary, ai_tags, project,
-                   access_count, path
-            FROM files WHERE status = 'active'
-            ORDER BY filename
-        """)
+        if files is None:
+            files = self._fetch_files(include_tags=False)
         
         with open(output_path, 'w', newline='') as f:
             writer = csv.writer(f)
@@ -121,15 +214,11 @@ class ExportManager:
             ])
             
             # Data
-            for row in cursor.fetchall():
-                writer.writerow(row)
-        
-        cursor.execute("SELECT COUNT(*) FROM files WHERE status = 'active'")
-        count = cursor.fetchone()[0]
+            writer.writerows(map(_TABLE_ROW, files))
         
-        return output_path, count
+        return output_path, len(files)
     
-    def export_to_html(self, output_path=None):
+    def export_to_html(self, output_path=None, files=None):
         """Export to beautiful HTML catalog"""
         if output_path is None:
             export_dir = os.path.expanduser("~/.fileorganizer/exports")
@@ -137,19 +226,11 @@ class ExportManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = os.path.join(export_dir, f"file_index_{timestamp}.html")
         
-        cursor = self.file_db.conn.cursor()
-        cursor.execute("""
-            SELECT filename, extension, size, modified_date, 
-                   folder_location, ai_summary, ai_tags, project,
-                   access_count, path
-            FROM files WHERE status = 'active'
-            ORDER BY filename
-        """)
-        
-        files = cursor.fetchall()
-        stats = self.file_db.get_stats()
+        if files is None:
+            files = self._fetch_files(include_tags=False)
+        stats = self._get_stats()
         
-        html = f"""<!DOCTYPE html>
+        header = f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
@@ -309,36 +390,42 @@ class ExportManager:
         <tbody>
 """
         
-        for row in files:
+        # Collect row fragments and join once at the end (linear, not quadratic)
+        rows = []
+        rows_append = rows.append
+        esc = _escape_html
+        
+        for row in map(_TABLE_ROW, files):
             filename, ext, size, modified, location, summary, tags, project, access_count, path = row
             
             # Format tags
             tags_html = ''
             if tags:
-                for tag in tags.split(','):
-                    tags_html += f'<span class="tag">{tag.strip()}</span> '
+                tags_html = ''.join(
+                    f'<span class="tag">{esc(tag.strip())}</span> ' for tag in tags.split(',')
+                )
             
             # Format project
-            project_html = f'<span class="project">{project}</span>' if project else '-'
+            project_html = f'<span class="project">{esc(project)}</span>' if project else '-'
             
             # Format summary
-            summary_html = f'<div class="summary">{summary}</div>' if summary else '-'
+            summary_html = f'<div class="summary">{esc(summary)}</div>' if summary else '-'
             
             # Shorten location
-            location_short = Path(location).name if location else '-'
+            location_short = esc(Path(location).name) if location else '-'
             
-            html += f"""
+            rows_append(f"""
             <tr>
-                <td><strong>{filename}</strong></td>
+                <td><strong>{esc(filename)}</strong></td>
                 <td>{summary_html}</td>
                 <td>{tags_html if tags_html else '-'}</td>
                 <td>{project_html}</td>
                 <td>{location_short}</td>
-                <td>{modified[:10] if modified else '-'}</td>
+                <td>{esc(modified[:10]) if modified else '-'}</td>
             </tr>
-"""
+""")
         
-        html += """
+        footer = """
         </tbody>
     </table>
 </body>
@@ -346,11 +433,11 @@ class ExportManager:
 """
         
         with open(output_path, 'w') as f:
-            f.write(html)
+            f.write(header + ''.join(rows) + footer)
         
         return output_path, len(files)
     
-    def export_to_markdown(self, output_path=None):
+    def export_to_markdown(self, output_path=None, files=None):
         """Export to Markdown format"""
         if output_path is None:
             export_dir = os.path.expanduser("~/.fileorganizer/exports")
@@ -358,18 +445,15 @@ class ExportManager:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = os.path.join(export_dir, f"file_index_{timestamp}.md")
         
-        cursor = self.file_db.conn.cursor()
-        cursor.execute("""
-            SELECT filename, extension, folder_location, 
-                   ai_summary, ai_tags, project, modified_date
-            FROM files WHERE status = 'active'
-            ORDER BY project, filename
-        """)
-        
-        files = cursor.fetchall()
-        stats = self.file_db.get_stats()
+        if files is None:
+            files = self._fetch_files(include_tags=False, order_by=_MARKDOWN_ORDER)
+        else:
+            # Shared rows are in filename order; a stable sort keeps that
+            # order within each project
+            files = sorted(files, key=_project_label)
+        stats = self._get_stats()
         
-        md = f"""# 📁 File Index
+        md_parts = [f"""# 📁 File Index
 
 Generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
 
@@ -381,36 +465,27 @@ Generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
 
 ## 📂 Files by Project
 
-"""
-        
-        # Group by project
-        by_project = {}
-        for row in files:
-            filename, ext, location, summary, tags, project, modified = row
-            project_key = project or "Uncategorized"
-            
-            if project_key not in by_project:
-                by_project[project_key] = []
-            by_project[project_key].append(row)
+"""]
+        add = md_parts.append
         
-        # Write each project section
-        for project, project_files in sorted(by_project.items()):
-            md += f"\n### {project}\n\n"
+        # Write each project section (rows arrive grouped by project)
+        for project, project_files in groupby(files, key=_project_label):
+            add(f"\n### {project}\n\n")
             
-            for row in project_files:
+            for row in map(_MARKDOWN_ROW, project_files):
                 filename, ext, location, summary, tags, _, modified = row
                 
-                md += f"**{filename}**\n"
+                add(f"**{filename}**\n")
                 if summary:
-                    md += f"- Summary: {summary}\n"
+                    add(f"- Summary: {summary}\n")
                 if tags:
-                    md += f"- Tags: {tags}\n"
-                md += f"- Location: {Path(location).name if location else 'Unknown'}\n"
-                md += f"- Modified: {modified[:10] if modified else 'Unknown'}\n"
-                md += "\n"
+                    add(f"- Tags: {tags}\n")
+                add(f"- Location: {Path(location).name if location else 'Unknown'}\n")
+                add(f"- Modified: {modified[:10] if modified else 'Unknown'}\n")
+                add("\n")
         
         with open(output_path, 'w') as f:
-            f.write(md)
+            f.write(''.join(md_parts))
         
         return output_path, len(files)
     
@@ -420,29 +495,29 @@ Generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
         
         print("📤 Exporting file index to all formats...")
         
-        # JSON
-        print("  → JSON...", end=" ")
-        json_path, json_count = self.export_to_json()
-        results['json'] = {'path': json_path, 'count': json_count}
-        print(f"✅ {json_count} files")
-        
-        # CSV
-        print("  → CSV...", end=" ")
-        csv_path, csv_count = self.export_to_csv()
-        results['csv'] = {'path': csv_path, 'count': csv_count}
-        print(f"✅ {csv_count} files")
-        
-        # HTML
-        print("  → HTML...", end=" ")
-        html_path, html_count = self.export_to_html()
-        results['html'] = {'path': html_path, 'count': html_count}
-        print(f"✅ {html_count} files")
-        
-        # Markdown
-        print("  → Markdown...", end=" ")
-        md_path, md_count = self.export_to_markdown()
-        results['markdown'] = {'path': md_path, 'count': md_count}
-        print(f"✅ {md_count} files")
+        # Fetch rows, stats and patterns once on this thread; the writers
+        # then only format and write files, so they can run side by side
+        files = self._fetch_files()
+        patterns = self.file_db.get_learned_patterns()
+        self._stats = self.file_db.get_stats()
+        
+        writers = [
+            ('json', 'JSON', lambda: self.export_to_json(files=files, patterns=patterns)),
+            ('csv', 'CSV', lambda: self.export_to_csv(files=files)),
+            ('html', 'HTML', lambda: self.export_to_html(files=files)),
+            ('markdown', 'Markdown', lambda: self.export_to_markdown(files=files)),
+        ]
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(writers)) as executor:
+                futures = [(key, label, executor.submit(writer)) for key, label, writer in writers]
+                
+                for key, label, future in futures:
+                    path, count = future.result()
+                    results[key] = {'path': path, 'count': count}
+                    print(f"  → {label}... ✅ {count} files")
+        finally:
+            self._stats = None
         
         return results
 
@@ -468,5 +543,6 @@ if __name__ == "__main__":
     print(f"\nLocation: ~/.fileorganizer/exports/")
     print("Open HTML file in browser for interactive catalog!")
     
+    exporter.close()
     db.close()
 
@@ -5,10 +5,111 @@ Integrations with Alfred, Raycast, DevonThink, Notion, Calendar, etc.
 """
 
 import os
+import csv
 import json
+import time
+import hashlib
+import itertools
+import tempfile
 import subprocess
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import urlencode
+
+
+# AppleScript handlers, compiled once with osacompile and run with argv so
+# no data is ever spliced into script source
+
+# argv: database name, then (path, comment, tags) per file
+DEVONTHINK_IMPORT_SCRIPT = '''
+on run argv
+    set databaseName to item 1 of argv
+    tell application "DEVONthink 3"
+        set theDatabase to open database databaseName
+        repeat with i from 2 to (count of argv) by 3
+            set fileIndex to (i + 1) div 3
+            try
+                set theRecord to import (item i of argv) to theDatabase
+                set theComment to item (i + 1) of argv
+                if theComment is not "" then
+                    set comment of theRecord to theComment
+                end if
+                set theTags to item (i + 2) of argv
+                if theTags is not "" then
+                    set tags of theRecord to theTags
+                end if
+                log "OK " & fileIndex
+            on error errMsg
+                log "FAIL " & fileIndex & " " & errMsg
+            end try
+        end repeat
+    end tell
+end run
+'''
+
+# argv: title, date string, notes
+CALENDAR_EVENT_SCRIPT = '''
+on run argv
+    set eventTitle to item 1 of argv
+    set eventDate to date (item 2 of argv)
+    set eventNotes to item 3 of argv
+    tell application "Calendar"
+        tell calendar "File Organizer"
+            set theEvent to make new event with properties {summary:eventTitle, start date:eventDate, end date:eventDate}
+            set description of theEvent to eventNotes
+        end tell
+    end tell
+end run
+'''
+
+# Files per DEVONthink osascript run (keeps argv well under ARG_MAX)
+DEVONTHINK_BATCH_SIZE = 200
+
+# Sequence for export file names (shared by all instances in the process)
+_export_counter = itertools.count()
+
+# Raycast extension manifest
+RAYCAST_PACKAGE_JSON = json.dumps({
+    "name": "file-organizer",
+    "title": "File Organizer",
+    "description": "Search and organize files with AI",
+    "icon": "📁",
+    "author": "File Organizer",
+    "license": "MIT",
+    "commands": [
+        {
+            "name": "search-files",
+            "title": "Search Files",
+            "description": "Search indexed files",
+            "mode": "view"
+        }
+    ]
+}, indent=2)
+
+
+@lru_cache(maxsize=2)
+def _integration_config_json(config_dir, compact):
+    """Serialized integration config (depends only on the config dir)"""
+    config = {
+        'alfred_workflow': os.path.join(config_dir, "alfred_workflow"),
+        'raycast_extension': os.path.join(config_dir, "raycast_extension"),
+        'api_endpoint': 'http://localhost:8765',
+        'database_path': os.path.join(config_dir, "files.db"),
+        'url_scheme': 'fileorganizer://',
+        'supported_integrations': [
+            'Alfred',
+            'Raycast',
+            'DevonThink',
+            'Notion',
+            'Calendar',
+            'Obsidian'
+        ]
+    }
+    if compact:
+        return json.dumps(config, separators=(',', ':'))
+    return json.dumps(config, indent=2)
 
 
 class ExternalToolIntegration:
@@ -18,6 +119,46 @@ class ExternalToolIntegration:
         self.db = db
         self.config_dir = os.path.expanduser("~/.fileorganizer")
         os.makedirs(self.config_dir, exist_ok=True)
+        
+        # Fixed locations, resolved once instead of on every call
+        self._alfred_dir = os.path.join(self.config_dir, "alfred_workflow")
+        self._raycast_dir = os.path.join(self.config_dir, "raycast_extension")
+        self._db_path = os.path.join(self.config_dir, "files.db")
+        self._config_path = os.path.join(self.config_dir, "integrations.json")
+        self._script_paths = {}
+        
+        # Background exports for callers that must not block (threads
+        # are only started on first submit)
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='fo-export')
+    
+    def _compiled_script(self, name, source):
+        """
+        Path to a compiled .scpt for this AppleScript source
+        
+        Compiled on first use into the config dir; the file name carries a
+        hash of the source so edits to the script trigger a recompile.
+        """
+        script_path = self._script_paths.get(name)
+        if script_path is not None:
+            return script_path
+        
+        digest = hashlib.md5(source.encode('utf-8')).hexdigest()[:8]
+        script_path = os.path.join(self.config_dir, f"{name}_{digest}.scpt")
+        
+        if not os.path.exists(script_path):
+            tmp_path = f"{script_path}.{os.getpid()}.tmp"
+            subprocess.run(['osacompile', '-o', tmp_path], input=source, check=True,
+                           capture_output=True, text=True)
+            os.replace(tmp_path, script_path)
+        
+        self._script_paths[name] = script_path
+        return script_path
+    
+    def _run_osascript(self, name, source, *args):
+        """Run a compiled AppleScript with argv, raising CalledProcessError on failure"""
+        script_path = self._compiled_script(name, source)
+        return subprocess.run(['osascript', script_path, *args], check=True,
+                              capture_output=True, text=True)
     
     # ===== Alfred Integration =====
     
@@ -27,7 +168,7 @@ class ExternalToolIntegration:
         Creates a script filter that searches the database
         """
         if output_dir is None:
-            output_dir = os.path.join(self.config_dir, "alfred_workflow")
+            output_dir = self._alfred_dir
         
         os.makedirs(output_dir, exist_ok=True)
         
@@ -55,20 +196,33 @@ class ExternalToolIntegration:
 import sys
 import json
 import sqlite3
-import os
+from pathlib import Path
 
-db_path = os.path.expanduser("~/.fileorganizer/files.db")
-conn = sqlite3.connect(db_path)
+# Read-only connection: no write locks or journal, pages memory-mapped
+db_path = {self._db_path!r}
+conn = sqlite3.connect(Path(db_path).as_uri() + "?mode=ro", uri=True)
+conn.execute("PRAGMA query_only=1")
+conn.execute("PRAGMA mmap_size=268435456")
+conn.execute("PRAGMA temp_store=MEMORY")
 cursor = conn.cursor()
 
 query = sys.argv[1] if len(sys.argv) > 1 else ""
 
-cursor.execute("""
-    SELECT filename, path, ai_summary
-    FROM files
-    WHERE filename LIKE ? OR content_text LIKE ?
-    LIMIT 20
-""", (f"%{{query}}%", f"%{{query}}%"))
+# Quote each word so FTS5 syntax characters are matched literally; the last
+# word is a prefix match since Alfred runs this on every keystroke
+terms = ['"' + word.replace('"', '""') + '"' for word in query.split()]
+if terms:
+    terms[-1] += "*"
+    cursor.execute("""
+        SELECT f.filename, f.path, f.ai_summary
+        FROM files_fts
+        JOIN files f ON f.id = files_fts.rowid
+        WHERE files_fts MATCH ?
+        ORDER BY rank
+        LIMIT 20
+    """, (" ".join(terms),))
+else:
+    cursor.execute("SELECT filename, path, ai_summary FROM files LIMIT 20")
 
 items = []
 for filename, path, summary in cursor.fetchall():
@@ -96,30 +250,13 @@ conn.close()
     def generate_raycast_extension(self, output_dir=None):
         """Generate Raycast extension for file search"""
         if output_dir is None:
-            output_dir = os.path.join(self.config_dir, "raycast_extension")
+            output_dir = self._raycast_dir
         
         os.makedirs(output_dir, exist_ok=True)
         
-        # Create package.json
-        package_json = {
-            "name": "file-organizer",
-            "title": "File Organizer",
-            "description": "Search and organize files with AI",
-            "icon": "📁",
-            "author": "File Organizer",
-            "license": "MIT",
-            "commands": [
-                {
-                    "name": "search-files",
-                    "title": "Search Files",
-                    "description": "Search indexed files",
-                    "mode": "view"
-                }
-            ]
-        }
-        
+        # Create package.json (static, serialized once at import)
         with open(os.path.join(output_dir, "package.json"), 'w') as f:
-            json.dump(package_json, f, indent=2)
+            f.write(RAYCAST_PACKAGE_JSON)
         
         return output_dir
     
@@ -134,41 +271,65 @@ conn.close()
             return {'success': False, 'error': 'No files provided'}
         
         cursor = self.db.conn.cursor()
-        placeholders = ','.join(['?' for _ in file_ids])
-        cursor.execute(f"""
+        # One SQL text for any number of ids (and no 999-parameter limit)
+        cursor.execute("""
             SELECT path, filename, ai_summary, ai_tags
             FROM files
-            WHERE id IN ({placeholders})
-        """, file_ids)
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(file_ids)),))
         
-        files = cursor.fetchall()
+        # Sorted by parent directory so each directory is listed, and its
+        # files imported, in one consecutive run
+        files = sorted(cursor, key=lambda row: os.path.dirname(row[0]))
         imported = []
         failed = []
         
+        # List each parent directory once instead of stat-ing every file
+        # (one call per directory on slow network volumes)
+        dir_entries = {}
+        to_import = []
         for path, filename, summary, tags in files:
-            if not os.path.exists(path):
+            parent, name = os.path.split(path)
+            names = dir_entries.get(parent)
+            if names is None:
+                try:
+                    with os.scandir(parent or '.') as entries:
+                        names = {entry.name for entry in entries}
+                except OSError:
+                    names = set()
+                dir_entries[parent] = names
+            if name not in names:
                 failed.append({'file': filename, 'error': 'File not found'})
                 continue
-            
-            # Create AppleScript to import into DevonThink
-            applescript = f'''
-            tell application "DEVONthink 3"
-                set theDatabase to open database "{database_name}"
-                set theRecord to import "{path}" to theDatabase
-                if "{summary}" is not "" then
-                    set comment of theRecord to "{summary}"
-                end if
-                if "{tags}" is not "" then
-                    set tags of theRecord to "{tags}"
-                end if
-            end tell
-            '''
+            to_import.append((path, filename, summary or '', tags or ''))
+        
+        # One AppleScript run per batch: DEVONthink and the database are
+        # opened once, and each file logs its own result
+        for start in range(0, len(to_import), DEVONTHINK_BATCH_SIZE):
+            batch = to_import[start:start + DEVONTHINK_BATCH_SIZE]
+            args = [database_name]
+            for path, _, summary, tags in batch:
+                args.extend((path, summary, tags))
             
             try:
-                subprocess.run(['osascript', '-e', applescript], check=True, capture_output=True)
-                imported.append(filename)
+                result = self._run_osascript('devonthink_import', DEVONTHINK_IMPORT_SCRIPT, *args)
+                
+                # AppleScript `log` output goes to stderr, one line per file
+                outcomes = {}
+                for line in result.stderr.splitlines():
+                    status, _, rest = line.partition(' ')
+                    index, _, message = rest.partition(' ')
+                    if status in ('OK', 'FAIL') and index.isdigit():
+                        outcomes[int(index)] = (status, message)
+                
+                for i, (_, filename, _, _) in enumerate(batch, 1):
+                    status, message = outcomes.get(i, ('FAIL', 'No result from DEVONthink'))
+                    if status == 'OK':
+                        imported.append(filename)
+                    else:
+                        failed.append({'file': filename, 'error': message})
             except subprocess.CalledProcessError as e:
-                failed.append({'file': filename, 'error': str(e)})
+                failed.extend({'file': filename, 'error': str(e)} for _, filename, _, _ in batch)
         
         return {
             'success': True,
@@ -185,40 +346,45 @@ conn.close()
         Creates a CSV that can be imported into Notion
         """
         cursor = self.db.conn.cursor()
-        placeholders = ','.join(['?' for _ in file_ids])
-        cursor.execute(f"""
+        # One SQL text for any number of ids (and no 999-parameter limit)
+        cursor.execute("""
             SELECT filename, ai_summary, ai_tags, project, path, modified_date
             FROM files
-            WHERE id IN ({placeholders})
-        """, file_ids)
-        
-        files = cursor.fetchall()
-        
-        # Create CSV content
-        csv_lines = ["Name,Summary,Tags,Project,Path,Date"]
-        
-        for filename, summary, tags, project, path, date in files:
-            # Escape quotes and commas
-            filename = filename.replace('"', '""')
-            summary = (summary or '').replace('"', '""')
-            tags = (tags or '').replace('"', '""')
-            project = (project or '').replace('"', '""')
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(file_ids)),))
+        
+        # Stream rows from the cursor into the CSV file in batches
+        # (csv.writer handles quoting, commas and embedded newlines)
+        # Timestamp plus a process-wide counter keeps names unique for
+        # exports within the same second; 'x' refuses to overwrite
+        output_path = os.path.join(
+            self.config_dir,
+            f"notion_export_{int(time.time())}_{next(_export_counter):x}.csv"
+        )
+        count = 0
+        with open(output_path, 'x', newline='', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(["Name", "Summary", "Tags", "Project", "Path", "Date"])
             
-            csv_lines.append(f'"{filename}","{summary}","{tags}","{project}","{path}","{date}"')
-        
-        csv_content = '\n'.join(csv_lines)
-        
-        # Save to file
-        output_path = os.path.join(self.config_dir, f"notion_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-        with open(output_path, 'w') as f:
-            f.write(csv_content)
+            # Whole batches go to writerows, which loops in C; csv.writer
+            # already writes None as an empty field
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                count += len(rows)
         
         return {
             'success': True,
             'file': output_path,
-            'count': len(files)
+            'count': count
         }
     
+    def prepare_notion_export_async(self, file_ids):
+        """Run prepare_notion_export in the background; returns a Future"""
+        return self._pool.submit(self.prepare_notion_export, list(file_ids))
+    
     # ===== Calendar Integration =====
     
     def create_calendar_event(self, file_id, event_title, event_date, notes=None):
@@ -246,18 +412,9 @@ conn.close()
         if notes:
             event_notes += f"\n\n{notes}"
         
-        # Create AppleScript for Calendar
-        applescript = f'''
-        tell application "Calendar"
-            tell calendar "File Organizer"
-                set theEvent to make new event with properties {{summary:"{event_title}", start date:date "{event_date}", end date:date "{event_date}"}}
-                set description of theEvent to "{event_notes}"
-            end tell
-        end tell
-        '''
-        
         try:
-            subprocess.run(['osascript', '-e', applescript], check=True, capture_output=True)
+            self._run_osascript('calendar_event', CALENDAR_EVENT_SCRIPT,
+                                event_title, str(event_date), event_notes)
             
             # Create reminder in our database too
             from reminder_system import ReminderSystem
@@ -281,7 +438,7 @@ conn.close()
         """
         cursor = self.db.conn.cursor()
         cursor.execute("""
-            SELECT filename, path, ai_summary, ai_tags, content_text
+            SELECT filename, path, ai_summary, ai_tags, SUBSTR(content_text, 1, 500)
             FROM files
             WHERE id = ?
         """, (file_id,))
@@ -290,46 +447,46 @@ conn.close()
         if not row:
             return {'success': False, 'error': 'File not found'}
         
+        # content is only the 500-character preview (sliced in SQL)
         filename, path, summary, tags, content = row
         
         # Generate note name
         if not note_name:
             note_name = Path(filename).stem
         
-        # Create markdown content
-        markdown = f"""# {filename}
-
-## File Information
-- **Path**: `{path}`
-- **Tags**: {tags or 'None'}
-
-## Summary
-{summary or 'No summary available'}
-
-## Content Preview
-```
-{(content or '')[:500]}...
-```
-
-## Links
-- [[File path: {path}]]
-
----
-Created: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-"""
+        # Create markdown content as parts; writelines writes them in turn
+        # without building one combined string first
+        markdown_parts = [
+            "# ", filename, "\n\n",
+            "## File Information\n",
+            "- **Path**: `", path, "`\n",
+            "- **Tags**: ", tags or 'None', "\n\n",
+            "## Summary\n",
+            summary or 'No summary available', "\n\n",
+            "## Content Preview\n```\n",
+            content or '', "...\n```\n\n",
+            "## Links\n",
+            "- [[File path: ", path, "]]\n\n",
+            "---\n",
+            "Created: ", datetime.now().strftime('%Y-%m-%d %H:%M'), "\n",
+        ]
         
         # Save to vault
         vault_path = os.path.expanduser(vault_path)
         note_path = os.path.join(vault_path, f"{note_name}.md")
         
         try:
-            with open(note_path, 'w') as f:
-                f.write(markdown)
+            with open(note_path, 'w', buffering=1 << 16) as f:
+                f.writelines(markdown_parts)
             
             return {'success': True, 'note_path': note_path}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def create_obsidian_note_async(self, file_id, vault_path, note_name=None):
+        """Run create_obsidian_note in the background; returns a Future"""
+        return self._pool.submit(self.create_obsidian_note, file_id, vault_path, note_name)
+    
     # ===== URL Schemes =====
     
     def get_url_scheme(self, action, **params):
@@ -338,34 +495,37 @@ Created: {datetime.now().strftime('%Y-%m-%d %H:%M')}
         e.g., fileorganizer://search?q=invoice
         """
         base = "fileorganizer://"
-        param_str = '&'.join([f"{k}={v}" for k, v in params.items()])
-        return f"{base}{action}?{param_str}"
+        return f"{base}{action}?{urlencode(params, doseq=True)}"
     
     # ===== Export Integration Config =====
     
-    def export_integration_config(self):
-        """Export configuration for all integrations"""
-        config = {
-            'alfred_workflow': os.path.join(self.config_dir, "alfred_workflow"),
-            'raycast_extension': os.path.join(self.config_dir, "raycast_extension"),
-            'api_endpoint': 'http://localhost:8765',
-            'database_path': os.path.join(self.config_dir, "files.db"),
-            'url_scheme': 'fileorganizer://',
-            'supported_integrations': [
-                'Alfred',
-                'Raycast',
-                'DevonThink',
-                'Notion',
-                'Calendar',
-                'Obsidian'
-            ]
-        }
+    def export_integration_config(self, compact=False):
+        """
+        Export configuration for all integrations
+        
+        Args:
+            compact: Write minified JSON instead of the indented form
+        """
+        config_json = _integration_config_json(self.config_dir, compact)
+        config_path = self._config_path
         
-        config_path = os.path.join(self.config_dir, "integrations.json")
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Write to a temp file and rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.config_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(config_json)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, config_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
         
         return config_path
+    
+    def close(self):
+        """Wait for pending background exports and stop the pool"""
+        self._pool.shutdown(wait=True)
 
 
 if __name__ == "__main__":
@@ -398,6 +558,7 @@ if __name__ == "__main__":
     print(f"  Open file: {tools.get_url_scheme('open', id='123')}")
     print(f"  Organize: {tools.get_url_scheme('organize', folder='Downloads')}")
     
+    tools.close()
     db.close()
     print("\n✅ External tools integration test complete!")
 
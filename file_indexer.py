@@ -5,13 +5,465 @@ Scans folders, extracts content, and stores in SQLite database
 """
 
 import os
+import json
+import time
 import sqlite3
 import hashlib
 import mimetypes
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime
+from functools import lru_cache, wraps
 from pathlib import Path
 import PyPDF2
 
+# Optional: PDFium bindings extract text far faster than PyPDF2
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+# Run PRAGMA optimize after this many commits through FileDatabase
+OPTIMIZE_EVERY_COMMITS = 1000
+
+# BLAKE2b digest size for file hashes (40 hex chars, so hashes from the
+# old MD5 scheme, 32 chars, are recognised and recomputed)
+FILE_HASH_DIGEST_SIZE = 20
+
+# Columns of the files table. The wide text columns come last: SQLite
+# has to follow a row's overflow pages to reach any column stored after
+# a large value, so metadata-only reads stop before the content.
+_FILES_TABLE_COLUMNS = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT UNIQUE NOT NULL,
+    filename TEXT NOT NULL,
+    extension TEXT,
+    size INTEGER,
+    created_date TEXT,
+    modified_date TEXT,
+    last_indexed TEXT,
+    file_hash TEXT,
+    mime_type TEXT,
+    folder_location TEXT,
+    ai_tags TEXT,
+    project TEXT,
+    status TEXT DEFAULT 'active',
+    access_count INTEGER DEFAULT 0,
+    last_accessed TEXT,
+    is_duplicate INTEGER DEFAULT 0,
+    duplicate_of INTEGER,
+    is_screenshot INTEGER DEFAULT 0,
+    hide_from_app INTEGER DEFAULT 0,
+    source TEXT DEFAULT 'filesystem',
+    source_id TEXT,
+    ai_summary TEXT,
+    content_text TEXT,
+    ocr_text TEXT
+"""
+_FILES_COLUMN_NAMES = [line.split()[0] for line in _FILES_TABLE_COLUMNS.strip().splitlines()]
+
+# Version stored in PRAGMA user_version once SCHEMA_SQL has been applied;
+# bump it whenever SCHEMA_SQL or _migrate_database changes so existing
+# databases pick the change up
+SCHEMA_VERSION = 2
+
+# Every table, index and trigger FileDatabase owns, applied in one script
+SCHEMA_SQL = f"""
+-- Files table
+CREATE TABLE IF NOT EXISTS files ({_FILES_TABLE_COLUMNS});
+
+-- Tags table (for easy filtering)
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_id INTEGER,
+    tag TEXT,
+    FOREIGN KEY (file_id) REFERENCES files(id)
+);
+
+-- Conversation history table
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    user_message TEXT NOT NULL,
+    assistant_response TEXT NOT NULL,
+    intent TEXT,
+    files_mentioned TEXT,
+    action_taken TEXT,
+    success INTEGER DEFAULT 1
+);
+
+-- User preferences and learned patterns
+CREATE TABLE IF NOT EXISTS learned_patterns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pattern_type TEXT NOT NULL,
+    pattern_key TEXT NOT NULL,
+    pattern_value TEXT,
+    frequency INTEGER DEFAULT 1,
+    last_used TEXT,
+    confidence REAL DEFAULT 0.5,
+    UNIQUE(pattern_type, pattern_key)
+);
+
+-- File interaction patterns (what files user accesses together)
+CREATE TABLE IF NOT EXISTS file_relationships (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file1_id INTEGER,
+    file2_id INTEGER,
+    relationship_type TEXT,
+    strength REAL DEFAULT 1.0,
+    last_observed TEXT,
+    FOREIGN KEY (file1_id) REFERENCES files(id),
+    FOREIGN KEY (file2_id) REFERENCES files(id)
+);
+
+-- Search history for learning search patterns
+CREATE TABLE IF NOT EXISTS search_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    query TEXT NOT NULL,
+    results_count INTEGER,
+    clicked_file_id INTEGER,
+    success INTEGER DEFAULT 0,
+    FOREIGN KEY (clicked_file_id) REFERENCES files(id)
+);
+
+-- Indexes for faster searches
+-- Filename lookups go through the NOCASE index below (or the
+-- full-text index); the plain one only cost writes
+DROP INDEX IF EXISTS idx_filename;
+
+-- LIKE is case-insensitive, so only a NOCASE index can serve prefix LIKEs
+CREATE INDEX IF NOT EXISTS idx_filename_nocase ON files(filename COLLATE NOCASE);
+
+CREATE INDEX IF NOT EXISTS idx_tags ON tags(tag);
+
+CREATE INDEX IF NOT EXISTS idx_project ON files(project);
+
+-- An index over content_text copied every file's text into a second
+-- b-tree and can't serve %substring% searches (files_fts does)
+DROP INDEX IF EXISTS idx_content;
+
+CREATE INDEX IF NOT EXISTS idx_conv_timestamp ON conversations(timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_pattern_type ON learned_patterns(pattern_type);
+
+CREATE INDEX IF NOT EXISTS idx_search_query ON search_history(query);
+
+CREATE INDEX IF NOT EXISTS idx_file_accessed ON files(last_accessed);
+
+-- Partial indexes over active files only (every listing filters on
+-- status = 'active'): the recent and frequently-accessed lists read
+-- their first rows in order, and the per-folder/extension stats and
+-- lookups scan just the indexed column
+DROP INDEX IF EXISTS idx_files_status_modified;
+
+DROP INDEX IF EXISTS idx_files_status_access;
+
+CREATE INDEX IF NOT EXISTS idx_files_active_modified ON files(modified_date DESC) WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_files_active_access ON files(access_count DESC, last_accessed DESC) WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_files_active_folder ON files(folder_location) WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_files_active_extension ON files(extension) WHERE status = 'active';
+
+-- Project-tagged active files (the chat's organize-by-project count and
+-- id list); covers both, so neither reads the files rows
+CREATE INDEX IF NOT EXISTS idx_files_active_project ON files(project) WHERE status = 'active' AND project != '';
+
+-- Covers get_file_state, so re-scans answer "unchanged?" from the
+-- index alone without touching the wide files rows
+CREATE INDEX IF NOT EXISTS idx_files_path_stat ON files(path, size, modified_date, file_hash);
+
+-- Full-text search virtual table for better content search
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+    filename, content_text, ai_summary, ai_tags, 
+    content=files, content_rowid=id
+);
+
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts(rowid, filename, content_text, ai_summary, ai_tags)
+    VALUES (new.id, new.filename, new.content_text, new.ai_summary, new.ai_tags);
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts(files_fts, rowid, filename, content_text, ai_summary, ai_tags)
+    VALUES ('delete', old.id, old.filename, old.content_text, old.ai_summary, old.ai_tags);
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_au
+AFTER UPDATE OF filename, content_text, ai_summary, ai_tags ON files BEGIN
+    INSERT INTO files_fts(files_fts, rowid, filename, content_text, ai_summary, ai_tags)
+    VALUES ('delete', old.id, old.filename, old.content_text, old.ai_summary, old.ai_tags);
+    INSERT INTO files_fts(rowid, filename, content_text, ai_summary, ai_tags)
+    VALUES (new.id, new.filename, new.content_text, new.ai_summary, new.ai_tags);
+END;
+
+-- Smart folders (saved searches)
+CREATE TABLE IF NOT EXISTS smart_folders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    description TEXT,
+    query TEXT NOT NULL,
+    icon TEXT DEFAULT '📁',
+    color TEXT DEFAULT '#3b82f6',
+    created_date TEXT NOT NULL,
+    last_used TEXT,
+    use_count INTEGER DEFAULT 0
+);
+
+-- Trash/deleted files tracking
+CREATE TABLE IF NOT EXISTS trash (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    original_path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    deleted_date TEXT NOT NULL,
+    deleted_by TEXT DEFAULT 'user',
+    file_data BLOB,
+    metadata TEXT,
+    can_recover INTEGER DEFAULT 1
+);
+
+-- Reminders and nudges
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_id INTEGER,
+    reminder_type TEXT NOT NULL,
+    reminder_date TEXT NOT NULL,
+    message TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_date TEXT NOT NULL,
+    triggered_date TEXT,
+    FOREIGN KEY (file_id) REFERENCES files(id)
+);
+
+-- Smart suggestions
+CREATE TABLE IF NOT EXISTS suggestions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    suggestion_type TEXT NOT NULL,
+    message TEXT NOT NULL,
+    action_data TEXT,
+    priority INTEGER DEFAULT 5,
+    created_date TEXT NOT NULL,
+    dismissed INTEGER DEFAULT 0,
+    accepted INTEGER DEFAULT 0
+);
+
+-- File aging rules
+CREATE TABLE IF NOT EXISTS aging_rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    folder_pattern TEXT NOT NULL,
+    age_days INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    destination TEXT,
+    enabled INTEGER DEFAULT 1,
+    created_date TEXT NOT NULL
+);
+
+-- File events for temporal tracking
+CREATE TABLE IF NOT EXISTS file_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_id INTEGER,
+    event_type TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    metadata TEXT,
+    FOREIGN KEY (file_id) REFERENCES files(id)
+);
+
+-- Bookmarks and URLs
+CREATE TABLE IF NOT EXISTS bookmarks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    tags TEXT,
+    source TEXT,
+    created_date TEXT NOT NULL,
+    last_accessed TEXT,
+    access_count INTEGER DEFAULT 0,
+    downloaded_file_id INTEGER,
+    metadata TEXT,
+    FOREIGN KEY (downloaded_file_id) REFERENCES files(id)
+);
+
+-- Bulk operations history (for undo)
+CREATE TABLE IF NOT EXISTS bulk_operations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation_type TEXT NOT NULL,
+    operation_date TEXT NOT NULL,
+    files_affected TEXT NOT NULL,
+    original_state TEXT NOT NULL,
+    new_state TEXT,
+    can_undo INTEGER DEFAULT 1,
+    completed INTEGER DEFAULT 0
+);
+
+-- Screenshot metadata
+CREATE TABLE IF NOT EXISTS screenshot_metadata (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_id INTEGER,
+    capture_date TEXT,
+    source_app TEXT,
+    screen_region TEXT,
+    has_text INTEGER DEFAULT 0,
+    extracted_text TEXT,
+    FOREIGN KEY (file_id) REFERENCES files(id)
+);
+
+-- Mobile sync queue
+CREATE TABLE IF NOT EXISTS mobile_sync_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_id INTEGER,
+    action TEXT NOT NULL,
+    sync_date TEXT NOT NULL,
+    synced INTEGER DEFAULT 0,
+    device_id TEXT,
+    FOREIGN KEY (file_id) REFERENCES files(id)
+);
+
+-- Indices for new tables
+CREATE INDEX IF NOT EXISTS idx_file_events_date ON file_events(event_date);
+
+CREATE INDEX IF NOT EXISTS idx_bookmarks_url ON bookmarks(url);
+
+CREATE INDEX IF NOT EXISTS idx_bulk_ops_date ON bulk_operations(operation_date);
+
+CREATE INDEX IF NOT EXISTS idx_screenshot_file ON screenshot_metadata(file_id);
+
+CREATE INDEX IF NOT EXISTS idx_reminders_date ON reminders(reminder_date);
+"""
+
+# Files larger than this are not indexed
+MAX_INDEX_FILE_SIZE = 50 * 1024 * 1024
+
+# Pages of a PDF read for its text, and how many leading pages with no
+# text at all mark it as a scan (no text layer) so the rest are skipped
+PDF_MAX_PAGES = 10
+PDF_BLANK_PROBE_PAGES = 3
+
+# Files indexed per transaction during folder scans
+INDEX_BATCH_SIZE = 1000
+
+# Threads reading/hashing files during folder scans, and how many files
+# may be read ahead of the database writer
+INDEX_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+INDEX_READ_AHEAD = 256
+
+# Threads listing folders during folder scans (one folder per task), so
+# slow disks and network shares get several directory reads in flight
+SCAN_WORKERS = 8
+
+# Windows hides files with an attribute (FILE_ATTRIBUTE_HIDDEN) rather
+# than a leading dot; its DirEntry.stat() comes free with the listing
+_WINDOWS_HIDDEN = 0x2 if os.name == 'nt' else 0
+
+# Columns add_file writes: the first ones are required in file_info,
+# the optional ones default to ''. On re-index only the update columns
+# change (created_date, mime_type and folder_location keep first values).
+_FILE_REQUIRED_COLUMNS = (
+    'path', 'filename', 'extension', 'size', 'created_date',
+    'modified_date', 'last_indexed', 'file_hash', 'mime_type', 'folder_location'
+)
+_FILE_OPTIONAL_COLUMNS = ('content_text', 'ai_summary', 'ai_tags', 'project')
+_FILE_UPDATE_COLUMNS = (
+    'filename', 'extension', 'size', 'modified_date', 'last_indexed',
+    'file_hash', 'content_text', 'ai_summary', 'ai_tags', 'project'
+)
+
+# add_file statements, generated once from the column lists (identical
+# text each call, so sqlite3 reuses the compiled statements from its
+# cache). One UPSERT replaces the old SELECT-then-UPDATE-or-INSERT;
+# RETURNING gives the id either way. executemany can't return rows, so
+# bulk writes use the statement without it.
+_FILE_INSERT_COLUMNS = _FILE_REQUIRED_COLUMNS + _FILE_OPTIONAL_COLUMNS
+_SQL_UPSERT_FILES = (
+    f"INSERT INTO files ({', '.join(_FILE_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_FILE_INSERT_COLUMNS))}) "
+    f"ON CONFLICT(path) DO UPDATE SET "
+    + ', '.join(f"{column} = excluded.{column}" for column in _FILE_UPDATE_COLUMNS)
+)
+_SQL_UPSERT_FILE = _SQL_UPSERT_FILES + " RETURNING id"
+
+_SQL_INSERT_TAG = "INSERT INTO tags (file_id, tag) VALUES (?, ?)"
+
+# Create a pattern, or reinforce it: bump the frequency and update
+# confidence as an exponential moving average
+_SQL_LEARN_PATTERN = """
+    INSERT INTO learned_patterns
+    (pattern_type, pattern_key, pattern_value, frequency, last_used, confidence)
+    VALUES (?, ?, ?, 1, ?, ?)
+    ON CONFLICT(pattern_type, pattern_key) DO UPDATE SET
+        frequency = frequency + 1,
+        confidence = confidence * 0.7 + excluded.confidence * 0.3,
+        last_used = excluded.last_used,
+        pattern_value = excluded.pattern_value
+"""
+
+
+def _file_row(file_info):
+    """Parameters for the files UPSERT, in _FILE_INSERT_COLUMNS order"""
+    return (tuple(file_info[column] for column in _FILE_REQUIRED_COLUMNS)
+            + tuple(file_info.get(column, '') for column in _FILE_OPTIONAL_COLUMNS))
+
+
+# (unix second, ISO string) for _now_iso
+_now_cache = (None, None)
+
+
+def _now_iso():
+    """
+    Current local time as an ISO string, formatted at most once a second
+    
+    For the high-volume timestamps (indexing, access counts, patterns,
+    search log); second resolution is plenty there.
+    """
+    global _now_cache
+    second = int(time.time())
+    cached_second, iso = _now_cache
+    if second != cached_second:
+        iso = datetime.fromtimestamp(second).isoformat()
+        _now_cache = (second, iso)
+    return iso
+
+
+@lru_cache(maxsize=1024)
+def _guess_mime(ext):
+    """MIME type for a (lowercase) file extension, or 'unknown'"""
+    return mimetypes.guess_type('file' + ext)[0] or 'unknown'
+
+
+def _fts_query(query):
+    """
+    FTS5 MATCH expression for a user query, or None if it has no words
+    
+    Each word is quoted (so FTS5 syntax characters are taken literally)
+    and the last one is a prefix match, for search-as-you-type.
+    """
+    words = [word for word in query.split() if any(ch.isalnum() for ch in word)]
+    if not words:
+        return None
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _writes(method):
+    """
+    Run a FileDatabase write under its write lock
+    
+    The connection is shared between threads, so a write from one thread
+    while another holds a batch open would land in (and commit or roll
+    back with) that batch; holding the lock makes it wait instead.
+    """
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return locked
+
 
 class FileDatabase:
     """Manages SQLite database for file index"""
@@ -24,6 +476,13 @@ class FileDatabase:
         
         self.db_path = db_path
         self.conn = None
+        # Separate read-only connection for searches and listings
+        self._reader_conn = None
+        self._commit_count = 0
+        # Thread id of the open batch (see batch), and the lock writers
+        # take so they never run inside another thread's batch
+        self._batch_thread = None
+        self._write_lock = threading.RLock()
         self.init_database()
     
     def init_database(self):
@@ -31,288 +490,130 @@ class FileDatabase:
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         cursor = self.conn.cursor()
         
-        # Check if this is a new database or needs migration
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='files'")
-        files_table_exists = cursor.fetchone() is not None
-        
-        # Files table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS files (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                path TEXT UNIQUE NOT NULL,
-                filename TEXT NOT NULL,
-                extension TEXT,
-                size INTEGER,
-                created_date TEXT,
-                modified_date TEXT,
-                last_indexed TEXT,
-                file_hash TEXT,
-                mime_type TEXT,
-                folder_location TEXT,
-                content_text TEXT,
-                ai_summary TEXT,
-                ai_tags TEXT,
-                project TEXT,
-                status TEXT DEFAULT 'active',
-                access_count INTEGER DEFAULT 0,
-                last_accessed TEXT,
-                is_duplicate INTEGER DEFAULT 0,
-                duplicate_of INTEGER,
-                ocr_text TEXT,
-                is_screenshot INTEGER DEFAULT 0,
-                hide_from_app INTEGER DEFAULT 0,
-                source TEXT DEFAULT 'filesystem',
-                source_id TEXT
-            )
+        # WAL with NORMAL sync: one fsync per checkpoint instead of two per
+        # commit, and readers (exports, Alfred) don't block the indexer
+        cursor.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-65536;
+            PRAGMA mmap_size=268435456;
+            PRAGMA busy_timeout=5000;
+            PRAGMA analysis_limit=400;
         """)
         
-        # Tags table (for easy filtering)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id INTEGER,
-                tag TEXT,
-                FOREIGN KEY (file_id) REFERENCES files(id)
-            )
-        """)
+        # The schema (and column migrations) only need applying when the
+        # database is older than this code; otherwise startup skips them
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] < SCHEMA_VERSION:
+            self._apply_schema(cursor)
         
-        # Conversation history table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                user_message TEXT NOT NULL,
-                assistant_response TEXT NOT NULL,
-                intent TEXT,
-                files_mentioned TEXT,
-                action_taken TEXT,
-                success INTEGER DEFAULT 1
-            )
-        """)
+        self._reader_conn = self._open_reader()
+    
+    def _open_reader(self):
+        """
+        Open the read-only connection used by searches and listings
         
-        # User preferences and learned patterns
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS learned_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pattern_type TEXT NOT NULL,
-                pattern_key TEXT NOT NULL,
-                pattern_value TEXT,
-                frequency INTEGER DEFAULT 1,
-                last_used TEXT,
-                confidence REAL DEFAULT 0.5,
-                UNIQUE(pattern_type, pattern_key)
-            )
-        """)
+        With WAL a reader on its own connection sees the last committed
+        snapshot and never waits on the indexer's write transaction.
+        Falls back to the main connection for in-memory databases.
+        """
+        if self.db_path == ':memory:':
+            return self.conn
         
-        # File interaction patterns (what files user accesses together)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS file_relationships (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file1_id INTEGER,
-                file2_id INTEGER,
-                relationship_type TEXT,
-                strength REAL DEFAULT 1.0,
-                last_observed TEXT,
-                FOREIGN KEY (file1_id) REFERENCES files(id),
-                FOREIGN KEY (file2_id) REFERENCES files(id)
-            )
-        """)
+        try:
+            uri = Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+            reader = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            reader.execute("PRAGMA query_only=1")
+            reader.execute("PRAGMA mmap_size=268435456")
+        except sqlite3.Error as e:
+            print(f"Note: Using main connection for reads: {e}")
+            return self.conn
+        
+        return reader
+    
+    def _reader(self):
+        """Connection for read-only queries"""
+        # Inside a batch, its own reads must see its uncommitted writes;
+        # other threads keep reading the last committed snapshot
+        if self._batch_thread == threading.get_ident() or self._reader_conn is None:
+            return self.conn
+        return self._reader_conn
+    
+    def _apply_schema(self, cursor):
+        """Create or upgrade the tables, indexes and triggers in SCHEMA_SQL"""
+        columns_current = True
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='files'")
+        if cursor.fetchone() is not None:
+            columns_current = self._move_large_columns_last(cursor)
+            # Migrate existing database to add new columns
+            self._migrate_database()
+        
+        # The full-text index is filled by triggers from here on
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='files_ai'")
+        fts_triggers_exist = cursor.fetchone() is not None
+        
+        # One transaction for the whole script (left open so the rebuild
+        # and version bump below commit with it)
+        cursor.executescript("BEGIN;\n" + SCHEMA_SQL)
+        
+        # Index rows written before the triggers existed
+        if not fts_triggers_exist:
+            cursor.execute("INSERT INTO files_fts(files_fts) VALUES('rebuild')")
+        
+        # A failed column reorder leaves the version alone so the upgrade
+        # is retried on the next open
+        if columns_current:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+    
+    def _move_large_columns_last(self, cursor):
+        """
+        Rebuild an older files table into the current column order
+        
+        Databases created before the large text columns were moved to the
+        end get copied into a fresh table once; ids are kept, and indexes
+        and triggers are recreated from SCHEMA_SQL afterwards. Returns
+        False if the rebuild failed and the old order is still in place.
+        """
+        cursor.execute("PRAGMA table_info(files)")
+        old_columns = cursor.fetchall()
+        names = [col[1] for col in old_columns]
+        if names[:len(_FILES_COLUMN_NAMES)] == _FILES_COLUMN_NAMES:
+            return True
         
-        # Search history for learning search patterns
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS search_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                query TEXT NOT NULL,
-                results_count INTEGER,
-                clicked_file_id INTEGER,
-                success INTEGER DEFAULT 0,
-                FOREIGN KEY (clicked_file_id) REFERENCES files(id)
-            )
-        """)
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'files'")
+        sequence = cursor.fetchone()
         
-        # Migrate existing files table if needed
-        if files_table_exists:
-            # Check if new columns exist
-            cursor.execute("PRAGMA table_info(files)")
-            columns = {row[1] for row in cursor.fetchall()}
+        if self.conn.in_transaction:
+            self.conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(f"CREATE TABLE files_reordered ({_FILES_TABLE_COLUMNS})")
+            cursor.execute("PRAGMA table_info(files_reordered)")
+            new_names = {col[1] for col in cursor.fetchall()}
             
-            if 'access_count' not in columns:
-                cursor.execute("ALTER TABLE files ADD COLUMN access_count INTEGER DEFAULT 0")
-            if 'last_accessed' not in columns:
-                cursor.execute("ALTER TABLE files ADD COLUMN last_accessed TEXT")
-        
-        # Indexes for faster searches
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_filename ON files(filename)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tags ON tags(tag)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_project ON files(project)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_content ON files(content_text)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_conv_timestamp ON conversations(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pattern_type ON learned_patterns(pattern_type)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_query ON search_history(query)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_accessed ON files(last_accessed)")
-        
-        # Full-text search virtual table for better content search
-        cursor.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
-                filename, content_text, ai_summary, ai_tags, 
-                content=files, content_rowid=id
-            )
-        """)
-        
-        # Smart folders (saved searches)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS smart_folders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                query TEXT NOT NULL,
-                icon TEXT DEFAULT '📁',
-                color TEXT DEFAULT '#3b82f6',
-                created_date TEXT NOT NULL,
-                last_used TEXT,
-                use_count INTEGER DEFAULT 0
-            )
-        """)
-        
-        # Trash/deleted files tracking
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trash (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                original_path TEXT NOT NULL,
-                filename TEXT NOT NULL,
-                deleted_date TEXT NOT NULL,
-                deleted_by TEXT DEFAULT 'user',
-                file_data BLOB,
-                metadata TEXT,
-                can_recover INTEGER DEFAULT 1
-            )
-        """)
-        
-        # Reminders and nudges
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id INTEGER,
-                reminder_type TEXT NOT NULL,
-                reminder_date TEXT NOT NULL,
-                message TEXT,
-                is_active INTEGER DEFAULT 1,
-                created_date TEXT NOT NULL,
-                triggered_date TEXT,
-                FOREIGN KEY (file_id) REFERENCES files(id)
-            )
-        """)
-        
-        # Smart suggestions
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS suggestions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                suggestion_type TEXT NOT NULL,
-                message TEXT NOT NULL,
-                action_data TEXT,
-                priority INTEGER DEFAULT 5,
-                created_date TEXT NOT NULL,
-                dismissed INTEGER DEFAULT 0,
-                accepted INTEGER DEFAULT 0
-            )
-        """)
-        
-        # File aging rules
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS aging_rules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                folder_pattern TEXT NOT NULL,
-                age_days INTEGER NOT NULL,
-                action TEXT NOT NULL,
-                destination TEXT,
-                enabled INTEGER DEFAULT 1,
-                created_date TEXT NOT NULL
-            )
-        """)
-        
-        # File events for temporal tracking
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS file_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id INTEGER,
-                event_type TEXT NOT NULL,
-                event_date TEXT NOT NULL,
-                metadata TEXT,
-                FOREIGN KEY (file_id) REFERENCES files(id)
-            )
-        """)
-        
-        # Bookmarks and URLs
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bookmarks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT NOT NULL,
-                title TEXT,
-                description TEXT,
-                tags TEXT,
-                source TEXT,
-                created_date TEXT NOT NULL,
-                last_accessed TEXT,
-                access_count INTEGER DEFAULT 0,
-                downloaded_file_id INTEGER,
-                metadata TEXT,
-                FOREIGN KEY (downloaded_file_id) REFERENCES files(id)
-            )
-        """)
-        
-        # Bulk operations history (for undo)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bulk_operations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                operation_type TEXT NOT NULL,
-                operation_date TEXT NOT NULL,
-                files_affected TEXT NOT NULL,
-                original_state TEXT NOT NULL,
-                new_state TEXT,
-                can_undo INTEGER DEFAULT 1,
-                completed INTEGER DEFAULT 0
-            )
-        """)
-        
-        # Screenshot metadata
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS screenshot_metadata (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id INTEGER,
-                capture_date TEXT,
-                source_app TEXT,
-                screen_region TEXT,
-                has_text INTEGER DEFAULT 0,
-                extracted_text TEXT,
-                FOREIGN KEY (file_id) REFERENCES files(id)
-            )
-        """)
-        
-        # Mobile sync queue
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mobile_sync_queue (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id INTEGER,
-                action TEXT NOT NULL,
-                sync_date TEXT NOT NULL,
-                synced INTEGER DEFAULT 0,
-                device_id TEXT,
-                FOREIGN KEY (file_id) REFERENCES files(id)
-            )
-        """)
-        
-        # Indices for new tables
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_events_date ON file_events(event_date)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookmarks_url ON bookmarks(url)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bulk_ops_date ON bulk_operations(operation_date)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_screenshot_file ON screenshot_metadata(file_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_reminders_date ON reminders(reminder_date)")
-        
-        self.conn.commit()
-        
-        # Migrate existing database to add new columns
-        self._migrate_database()
+            # Keep any columns added outside this schema
+            for _, name, col_type, _, default, _ in old_columns:
+                if name not in new_names:
+                    definition = f"{name} {col_type}"
+                    if default is not None:
+                        definition += f" DEFAULT {default}"
+                    cursor.execute(f"ALTER TABLE files_reordered ADD COLUMN {definition}")
+            
+            column_list = ', '.join(names)
+            cursor.execute(f"INSERT INTO files_reordered ({column_list}) SELECT {column_list} FROM files")
+            cursor.execute("DROP TABLE files")
+            cursor.execute("ALTER TABLE files_reordered RENAME TO files")
+            if sequence:
+                cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'files'", sequence)
+            self.conn.commit()
+            print("✅ Moved large text columns to the end of the files table")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Note: Could not reorder files table columns: {e}")
+            return False
     
     def _migrate_database(self):
         """Add new columns to existing tables if they don't exist"""
@@ -342,11 +643,91 @@ class FileDatabase:
         
         self.conn.commit()
     
+    def _commit(self):
+        """Commit, refreshing query planner stats every so often"""
+        if self._batch_thread == threading.get_ident():
+            return
+        self.conn.commit()
+        self._commit_count += 1
+        if self._commit_count % OPTIMIZE_EVERY_COMMITS == 0:
+            self.optimize()
+    
+    def optimize(self):
+        """
+        Refresh query planner statistics for tables that changed a lot
+        
+        Cheap when nothing did (analysis_limit keeps ANALYZE sampling
+        bounded); worth calling after bulk inserts so the planner keeps
+        choosing the right indexes.
+        """
+        self.conn.execute("PRAGMA optimize")
+    
+    def _row_cursor(self):
+        """Read-only cursor returning sqlite3.Row, for getters that hand back dicts"""
+        cursor = self._reader().cursor()
+        cursor.row_factory = sqlite3.Row
+        return cursor
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group writes into one transaction
+        
+        Inside the block add_file, log_* and learn_pattern skip their own
+        commits; everything is committed once on exit (or rolled back on
+        an exception). Nested blocks join the outer transaction. The
+        batch belongs to the thread that opened it: writes from other
+        threads wait for it to finish.
+        """
+        if self._batch_thread == threading.get_ident():
+            yield
+            return
+        
+        with self._write_lock:
+            if self.conn.in_transaction:
+                self.conn.commit()
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._batch_thread = threading.get_ident()
+            try:
+                yield
+            except BaseException:
+                self._batch_thread = None
+                self.conn.rollback()
+                raise
+            self._batch_thread = None
+            self._commit()
+    
+    @contextmanager
+    def write(self):
+        """
+        Transaction for writes made directly on the connection
+        
+        For code outside this class that runs its own SQL: yields the
+        connection under the write lock (waiting for another thread's
+        batch rather than joining it) and commits on exit, or rolls back
+        on an exception. Inside this thread's own batch it joins the batch.
+        """
+        with self._write_lock:
+            if self._batch_thread == threading.get_ident():
+                yield self.conn
+                return
+            
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self._commit()
+    
     def get_file_hash(self, filepath):
         """Generate hash of file for change detection"""
         try:
-            with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+            # Streamed in 1 MB chunks so large files never sit in memory
+            h = hashlib.blake2b(digest_size=FILE_HASH_DIGEST_SIZE)
+            with open(filepath, 'rb', buffering=0) as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+            return h.hexdigest()
         except Exception as e:
             print(f"Error hashing {filepath}: {e}")
             return None
@@ -357,88 +738,163 @@ class FileDatabase:
         cursor.execute("SELECT id, file_hash FROM files WHERE path = ?", (filepath,))
         return cursor.fetchone()
     
+    def get_file_state(self, filepath):
+        """Stored (size, modified_date, file_hash) for a path, or None"""
+        cursor = self.conn.cursor()
+        # The planner would pick the UNIQUE(path) index and then read the
+        # table row; the covering index answers from the index alone
+        cursor.execute("""
+            SELECT size, modified_date, file_hash
+            FROM files INDEXED BY idx_files_path_stat
+            WHERE path = ?
+        """, (filepath,))
+        return cursor.fetchone()
+    
+    def get_file_states(self, folder):
+        """
+        Stored (size, modified_date, file_hash) for every file under folder
+        
+        Returns a dict keyed by path, read with one range scan of the
+        covering index, so a re-scan can check files without a query each.
+        """
+        prefix = os.path.join(folder, '')
+        # Paths under the folder sort between "folder/" and "folder0"
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        
+        cursor = self._reader().cursor()
+        cursor.execute("""
+            SELECT path, size, modified_date, file_hash
+            FROM files INDEXED BY idx_files_path_stat
+            WHERE path >= ? AND path < ?
+        """, (prefix, upper))
+        return {path: (size, modified_date, file_hash)
+                for path, size, modified_date, file_hash in cursor}
+    
+    def get_files_by_path(self, paths):
+        """Rows for the given paths as dicts keyed by path (paths not indexed are left out)"""
+        cursor = self._row_cursor()
+        cursor.execute("""
+            SELECT path, filename, extension, ai_summary, ai_tags, project,
+                   folder_location, modified_date
+            FROM files WHERE path IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(paths)),))
+        return {row['path']: dict(row) for row in cursor}
+    
+    @_writes
     def add_file(self, file_info):
         """Add or update file in database"""
         cursor = self.conn.cursor()
         
-        # Check if file exists
-        existing = self.file_exists(file_info['path'])
-        
-        if existing:
-            # Update existing file
-            cursor.execute("""
-                UPDATE files SET
-                    filename = ?,
-                    extension = ?,
-                    size = ?,
-                    modified_date = ?,
-                    last_indexed = ?,
-                    file_hash = ?,
-                    content_text = ?,
-                    ai_summary = ?,
-                    ai_tags = ?,
-                    project = ?
-                WHERE path = ?
-            """, (
-                file_info['filename'],
-                file_info['extension'],
-                file_info['size'],
-                file_info['modified_date'],
-                file_info['last_indexed'],
-                file_info['file_hash'],
-                file_info.get('content_text', ''),
-                file_info.get('ai_summary', ''),
-                file_info.get('ai_tags', ''),
-                file_info.get('project', ''),
-                file_info['path']
-            ))
-            file_id = existing[0]
-        else:
-            # Insert new file
-            cursor.execute("""
-                INSERT INTO files (
-                    path, filename, extension, size, created_date,
-                    modified_date, last_indexed, file_hash, mime_type,
-                    folder_location, content_text, ai_summary, ai_tags, project
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                file_info['path'],
-                file_info['filename'],
-                file_info['extension'],
-                file_info['size'],
-                file_info['created_date'],
-                file_info['modified_date'],
-                file_info['last_indexed'],
-                file_info['file_hash'],
-                file_info['mime_type'],
-                file_info['folder_location'],
-                file_info.get('content_text', ''),
-                file_info.get('ai_summary', ''),
-                file_info.get('ai_tags', ''),
-                file_info.get('project', '')
-            ))
-            file_id = cursor.lastrowid
+        # Insert, or update the existing row for this path
+        cursor.execute(_SQL_UPSERT_FILE, _file_row(file_info))
+        file_id = cursor.fetchone()[0]
         
         # Add tags
         if 'tags' in file_info and file_info['tags']:
             # Clear old tags
             cursor.execute("DELETE FROM tags WHERE file_id = ?", (file_id,))
             # Add new tags
-            for tag in file_info['tags']:
-                cursor.execute("INSERT INTO tags (file_id, tag) VALUES (?, ?)", (file_id, tag))
+            cursor.executemany(_SQL_INSERT_TAG, [(file_id, tag) for tag in file_info['tags']])
         
-        self.conn.commit()
+        self._commit()
         return file_id
     
+    @_writes
+    def bulk_add_files(self, file_infos):
+        """
+        Add or update many files in one transaction
+        
+        Same effect as add_file for each, but with one executemany for the
+        rows and one for their tags. Returns the file ids in input order.
+        """
+        file_infos = list(file_infos)
+        if not file_infos:
+            return []
+        
+        cursor = self.conn.cursor()
+        with self.batch():
+            cursor.executemany(_SQL_UPSERT_FILES, [_file_row(info) for info in file_infos])
+            
+            # Ids for all rows at once (new and existing alike)
+            cursor.execute(
+                "SELECT path, id FROM files WHERE path IN (SELECT value FROM json_each(?))",
+                (json.dumps([info['path'] for info in file_infos]),)
+            )
+            ids = dict(cursor.fetchall())
+            file_ids = [ids[info['path']] for info in file_infos]
+            
+            # Replace tags for files that come with them
+            tagged = [(file_id, info['tags']) for file_id, info in zip(file_ids, file_infos) if info.get('tags')]
+            if tagged:
+                cursor.executemany("DELETE FROM tags WHERE file_id = ?", [(file_id,) for file_id, _ in tagged])
+                cursor.executemany(_SQL_INSERT_TAG, [(file_id, tag) for file_id, tags in tagged for tag in tags])
+        
+        return file_ids
+    
+    @_writes
+    def update_file_stat(self, filepath, size, modified_date):
+        """Record a new size/mtime for a file whose content is unchanged"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE files SET size = ?, modified_date = ?
+            WHERE path = ?
+        """, (size, modified_date, filepath))
+        self._commit()
+    
+    @_writes
     def remove_file(self, filepath):
         """Remove file from database (when file is deleted)"""
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM files WHERE path = ?", (filepath,))
-        self.conn.commit()
+        self._commit()
     
     def search_files(self, query, limit=50):
         """Search files by name, content, tags, or project"""
-        cursor = self.conn.cursor()
+        match = _fts_query(query)
+        if match is None:
+            # Nothing the full-text tokenizer can index (e.g. only symbols)
+            return self._search_files_like(query, limit)
+        
+        cursor = self._row_cursor()
+        
+        # Full-text match over filename, content, summary and AI tags,
+        # best BM25 rank first
+        cursor.execute("""
+            SELECT f.* FROM files_fts
+            JOIN files f ON f.id = files_fts.rowid
+            WHERE files_fts MATCH ? AND f.status = 'active'
+            ORDER BY files_fts.rank
+            LIMIT ?
+        """, (match, limit))
+        
+        results = [dict(row) for row in cursor.fetchall()]
+        
+        # Project names and the tags table aren't in the full-text index
+        if len(results) < limit:
+            search_pattern = f"%{query}%"
+            cursor.execute("""
+                SELECT f.* FROM files f
+                WHERE f.status = 'active' AND (
+                    f.project LIKE ? OR
+                    f.id IN (SELECT file_id FROM tags WHERE tag LIKE ?)
+                )
+                ORDER BY f.modified_date DESC
+                LIMIT ?
+            """, (search_pattern, search_pattern, limit))
+            
+            seen = {result['id'] for result in results}
+            for row in cursor.fetchall():
+                result = dict(row)
+                if result['id'] not in seen:
+                    results.append(result)
+                    if len(results) == limit:
+                        break
+        
+        return results
+    
+    def _search_files_like(self, query, limit):
+        """Substring search for queries the full-text index can't handle"""
+        cursor = self._row_cursor()
         
         # Search in multiple fields
         search_pattern = f"%{query}%"
@@ -458,16 +914,11 @@ class FileDatabase:
         """, (search_pattern, search_pattern, search_pattern, 
               search_pattern, search_pattern, search_pattern, limit))
         
-        columns = [desc[0] for desc in cursor.description]
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        
-        return results
+        return [dict(row) for row in cursor.fetchall()]
     
     def get_recent_files(self, limit=20):
         """Get recently modified files"""
-        cursor = self.conn.cursor()
+        cursor = self._row_cursor()
         cursor.execute("""
             SELECT * FROM files
             WHERE status = 'active'
@@ -475,16 +926,11 @@ class FileDatabase:
             LIMIT ?
         """, (limit,))
         
-        columns = [desc[0] for desc in cursor.description]
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        
-        return results
+        return [dict(row) for row in cursor.fetchall()]
     
     def get_stats(self):
         """Get database statistics"""
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         
         stats = {}
         
@@ -526,6 +972,7 @@ class FileDatabase:
         
         return stats
     
+    @_writes
     def log_conversation(self, user_message, assistant_response, intent=None, files_mentioned=None, action_taken=None, success=True):
         """Log a conversation for learning"""
         cursor = self.conn.cursor()
@@ -542,11 +989,11 @@ class FileDatabase:
             action_taken,
             1 if success else 0
         ))
-        self.conn.commit()
+        self._commit()
     
     def get_recent_conversations(self, limit=10):
         """Get recent conversation history"""
-        cursor = self.conn.cursor()
+        cursor = self._row_cursor()
         cursor.execute("""
             SELECT timestamp, user_message, assistant_response, intent, action_taken
             FROM conversations
@@ -554,49 +1001,36 @@ class FileDatabase:
             LIMIT ?
         """, (limit,))
         
-        columns = ['timestamp', 'user_message', 'assistant_response', 'intent', 'action_taken']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        return results
+        return [dict(row) for row in cursor.fetchall()]
     
+    @_writes
     def learn_pattern(self, pattern_type, pattern_key, pattern_value, confidence=0.5):
         """Learn or reinforce a user pattern"""
         cursor = self.conn.cursor()
+        cursor.execute(_SQL_LEARN_PATTERN,
+                       (pattern_type, pattern_key, pattern_value, _now_iso(), confidence))
+        self._commit()
+    
+    @_writes
+    def learn_patterns(self, patterns):
+        """
+        Learn or reinforce several patterns in one statement and commit
+        
+        patterns: iterable of (pattern_type, pattern_key, pattern_value, confidence)
+        """
+        now = _now_iso()
+        rows = [(pattern_type, pattern_key, pattern_value, now, confidence)
+                for pattern_type, pattern_key, pattern_value, confidence in patterns]
+        if not rows:
+            return
         
-        # Check if pattern exists
-        cursor.execute("""
-            SELECT id, frequency, confidence FROM learned_patterns
-            WHERE pattern_type = ? AND pattern_key = ?
-        """, (pattern_type, pattern_key))
-        
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Reinforce existing pattern
-            pattern_id, frequency, old_confidence = existing
-            new_frequency = frequency + 1
-            # Update confidence using exponential moving average
-            new_confidence = old_confidence * 0.7 + confidence * 0.3
-            
-            cursor.execute("""
-                UPDATE learned_patterns
-                SET frequency = ?, confidence = ?, last_used = ?, pattern_value = ?
-                WHERE id = ?
-            """, (new_frequency, new_confidence, datetime.now().isoformat(), pattern_value, pattern_id))
-        else:
-            # Create new pattern
-            cursor.execute("""
-                INSERT INTO learned_patterns 
-                (pattern_type, pattern_key, pattern_value, frequency, last_used, confidence)
-                VALUES (?, ?, ?, 1, ?, ?)
-            """, (pattern_type, pattern_key, pattern_value, datetime.now().isoformat(), confidence))
-        
-        self.conn.commit()
+        cursor = self.conn.cursor()
+        cursor.executemany(_SQL_LEARN_PATTERN, rows)
+        self._commit()
     
     def get_learned_patterns(self, pattern_type=None, min_confidence=0.3):
         """Get learned patterns, optionally filtered by type"""
-        cursor = self.conn.cursor()
+        cursor = self._row_cursor()
         
         if pattern_type:
             cursor.execute("""
@@ -613,15 +1047,11 @@ class FileDatabase:
                 ORDER BY frequency DESC, confidence DESC
             """, (min_confidence,))
         
-        columns = ['pattern_type', 'pattern_key', 'pattern_value', 'frequency', 'confidence']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        return results
+        return [dict(row) for row in cursor.fetchall()]
     
     def get_learned_patterns_by_type(self, pattern_type):
         """Get all learned patterns of a specific type"""
-        cursor = self.conn.cursor()
+        cursor = self._row_cursor()
         cursor.execute("""
             SELECT pattern_type, pattern_key, pattern_value, frequency, confidence, last_used
             FROM learned_patterns
@@ -629,21 +1059,19 @@ class FileDatabase:
             ORDER BY last_used DESC, frequency DESC
         """, (pattern_type,))
         
-        columns = ['pattern_type', 'pattern_key', 'pattern_value', 'frequency', 'confidence', 'last_used']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        return results
+        return [dict(row) for row in cursor.fetchall()]
     
+    @_writes
     def log_search(self, query, results_count, clicked_file_id=None, success=False):
         """Log a search for learning search patterns"""
         cursor = self.conn.cursor()
         cursor.execute("""
             INSERT INTO search_history (timestamp, query, results_count, clicked_file_id, success)
             VALUES (?, ?, ?, ?, ?)
-        """, (datetime.now().isoformat(), query, results_count, clicked_file_id, 1 if success else 0))
-        self.conn.commit()
+        """, (_now_iso(), query, results_count, clicked_file_id, 1 if success else 0))
+        self._commit()
     
+    @_writes
     def record_file_access(self, file_path):
         """Record when a file is accessed"""
         cursor = self.conn.cursor()
@@ -651,12 +1079,12 @@ class FileDatabase:
             UPDATE files 
             SET access_count = access_count + 1, last_accessed = ?
             WHERE path = ?
-        """, (datetime.now().isoformat(), file_path))
-        self.conn.commit()
+        """, (_now_iso(), file_path))
+        self._commit()
     
     def get_frequently_accessed_files(self, limit=20):
         """Get most frequently accessed files"""
-        cursor = self.conn.cursor()
+        cursor = self._row_cursor()
         cursor.execute("""
             SELECT path, filename, access_count, last_accessed, project
             FROM files
@@ -665,15 +1093,18 @@ class FileDatabase:
             LIMIT ?
         """, (limit,))
         
-        columns = ['path', 'filename', 'access_count', 'last_accessed', 'project']
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-        return results
+        return [dict(row) for row in cursor.fetchall()]
     
     def close(self):
         """Close database connection"""
+        if self._reader_conn is not None and self._reader_conn is not self.conn:
+            self._reader_conn.close()
+        self._reader_conn = None
         if self.conn:
+            try:
+                self.optimize()
+            except sqlite3.Error:
+                pass
             self.conn.close()
 
 
@@ -683,20 +1114,30 @@ class FileIndexer:
     def __init__(self, db, activity_log=None):
         self.db = db
         self.activity_log = activity_log
-        self.supported_text_extensions = [
+        self.supported_text_extensions = frozenset({
             '.txt', '.md', '.py', '.js', '.html', '.css', 
             '.json', '.xml', '.csv', '.log'
-        ]
-        self.supported_pdf_extensions = ['.pdf']
-        self.supported_image_extensions = ['.png', '.jpg', '.jpeg', '.gif']
+        })
+        self.supported_pdf_extensions = frozenset({'.pdf'})
+        self.supported_image_extensions = frozenset({'.png', '.jpg', '.jpeg', '.gif'})
+        
+        # Load the system MIME tables now rather than lazily on the first
+        # guess, which may happen on several worker threads at once
+        if not mimetypes.inited:
+            mimetypes.init()
     
     def log_activity(self, action, filename, details):
         """Log activity to the activity log widget"""
         if self.activity_log:
             self.activity_log.add_activity(action, filename, details)
     
-    def should_index_file(self, filepath):
-        """Determine if file should be indexed"""
+    def should_index_file(self, filepath, st=None):
+        """
+        Determine if file should be indexed
+        
+        Pass the file's os.stat result as `st` if it is already known, to
+        save a second stat call for the size check.
+        """
         # Skip hidden files
         if os.path.basename(filepath).startswith('.'):
             return False
@@ -707,7 +1148,8 @@ class FileIndexer:
         
         # Skip very large files (>50MB)
         try:
-            if os.path.getsize(filepath) > 50 * 1024 * 1024:
+            size = st.st_size if st is not None else os.path.getsize(filepath)
+            if size > MAX_INDEX_FILE_SIZE:
                 return False
         except:
             return False
@@ -722,7 +1164,7 @@ class FileIndexer:
             # Plain text files
             if ext in self.supported_text_extensions:
                 with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                    return f.read()[:10000]  # First 10k chars
+                    return f.read(10000)  # First 10k chars (text mode counts characters)
             
             # PDFs
             elif ext in self.supported_pdf_extensions:
@@ -740,73 +1182,313 @@ class FileIndexer:
     def extract_pdf_text(self, filepath):
         """Extract text from PDF"""
         try:
-            text = ""
-            with open(filepath, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                # Read first 10 pages max
-                for page_num in range(min(10, len(pdf_reader.pages))):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
-            return text[:10000]  # First 10k chars
+            if PDFIUM_AVAILABLE:
+                pages = self._iter_pdf_pages_pdfium(filepath)
+            else:
+                pages = self._iter_pdf_pages_pypdf2(filepath)
+            
+            texts = []
+            with closing(pages):
+                for page_text in pages:
+                    texts.append(page_text)
+                    if len(texts) == PDF_BLANK_PROBE_PAGES and not any(t.strip() for t in texts):
+                        # Image-only PDF; OCR is handled elsewhere
+                        return ""
+            return "".join(text + "\n" for text in texts)[:10000]  # First 10k chars
         except Exception as e:
             print(f"Error reading PDF {filepath}: {e}")
             return ""
     
-    def index_file(self, filepath):
-        """Index a single file"""
-        if not self.should_index_file(filepath):
-            return None
-        
+    def _iter_pdf_pages_pdfium(self, filepath):
+        """Yield the text of the first PDF_MAX_PAGES pages using PDFium"""
+        pdf = pdfium.PdfDocument(filepath)
         try:
-            stat = os.stat(filepath)
-            file_hash = self.db.get_file_hash(filepath)
-            
-            # Check if file needs updating
-            existing = self.db.file_exists(filepath)
-            if existing and existing[1] == file_hash:
-                # File hasn't changed, skip
+            for page_num in range(min(PDF_MAX_PAGES, len(pdf))):
+                page = pdf[page_num]
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range()
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+    
+    def _iter_pdf_pages_pypdf2(self, filepath):
+        """Yield the text of the first PDF_MAX_PAGES pages using PyPDF2"""
+        with open(filepath, 'rb') as f:
+            pdf_reader = PyPDF2.PdfReader(f)
+            for page_num in range(min(PDF_MAX_PAGES, len(pdf_reader.pages))):
+                yield pdf_reader.pages[page_num].extract_text()
+    
+    def _read_file_info(self, filepath, existing, stat=None):
+        """
+        Stat, hash and extract one file for indexing
+        
+        Does no database access, so it can run on worker threads.
+        `existing` is the stored (size, modified_date, file_hash) row or
+        None; `stat` is the file's os.stat result if already known.
+        Returns None when the file should be skipped; when only the
+        content hash is needed (content unchanged) the dict has no text.
+        """
+        # One stat serves both the size check and the file info
+        if stat is None:
+            try:
+                stat = os.stat(filepath)
+            except OSError:
                 return None
-            
-            # Extract file info
-            file_info = {
-                'path': filepath,
-                'filename': os.path.basename(filepath),
-                'extension': os.path.splitext(filepath)[1].lower(),
-                'size': stat.st_size,
-                'created_date': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                'modified_date': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'last_indexed': datetime.now().isoformat(),
-                'file_hash': file_hash,
-                'mime_type': mimetypes.guess_type(filepath)[0] or 'unknown',
-                'folder_location': os.path.dirname(filepath)
-            }
-            
-            # Extract content
+        if not self.should_index_file(filepath, stat):
+            return None
+        
+        modified_date = datetime.fromtimestamp(stat.st_mtime).isoformat()
+        
+        # Same size and mtime as the stored row: unchanged, no need to
+        # read the file at all
+        if (existing and existing[0] == stat.st_size and existing[1] == modified_date
+                and existing[2] and len(existing[2]) == FILE_HASH_DIGEST_SIZE * 2):
+            return None
+        
+        file_hash = self.db.get_file_hash(filepath)
+        
+        # Extension with a plain string scan of the name (hidden files
+        # never get here, so a dot at position 0 can't start one)
+        filename = os.path.basename(filepath)
+        dot = filename.rfind('.')
+        extension = filename[dot:].lower() if dot > 0 else ''
+        
+        # Extract file info
+        file_info = {
+            'path': filepath,
+            'filename': filename,
+            'extension': extension,
+            'size': stat.st_size,
+            'created_date': datetime.fromtimestamp(stat.st_ctime).isoformat(),
+            'modified_date': modified_date,
+            'last_indexed': _now_iso(),
+            'file_hash': file_hash,
+            'mime_type': _guess_mime(extension),
+            'folder_location': os.path.dirname(filepath)
+        }
+        
+        # Extract content (not needed if the content hasn't changed)
+        if not (existing and existing[2] == file_hash):
             content = self.extract_text_content(filepath)
             if content:
                 file_info['content_text'] = content
-            
-            # Add to database (AI tagging will happen in next step)
-            file_id = self.db.add_file(file_info)
-            
-            # Log activity
+        
+        return file_info
+    
+    def _store_file_info(self, file_info, existing):
+        """Write the result of _read_file_info; returns the file id or None"""
+        # Check if file needs updating
+        if existing and existing[2] == file_info['file_hash']:
+            # Content hasn't changed (only touched); remember the new
+            # size/mtime so the next scan can skip hashing, then skip
+            self.db.update_file_stat(file_info['path'], file_info['size'], file_info['modified_date'])
+            return None
+        
+        # Add to database (AI tagging will happen in next step)
+        file_id = self.db.add_file(file_info)
+        
+        # Log activity
+        self.log_activity(
+            "Indexed",
+            file_info['filename'],
+            f"Added to database (ID: {file_id})"
+        )
+        
+        return file_id
+    
+    def _add_indexed_files(self, file_infos):
+        """Write a batch of changed files; returns how many were added"""
+        if not file_infos:
+            return 0
+        
+        try:
+            file_ids = self.db.bulk_add_files(file_infos)
+        except sqlite3.Error:
+            # One bad row fails the whole executemany; retry one at a time
+            # so only that file is reported
+            added = 0
+            for file_info in file_infos:
+                try:
+                    if self._store_file_info(file_info, None):
+                        added += 1
+                except Exception as e:
+                    self._index_error(file_info['path'], e)
+            return added
+        
+        for file_info, file_id in zip(file_infos, file_ids):
             self.log_activity(
                 "Indexed",
                 file_info['filename'],
                 f"Added to database (ID: {file_id})"
             )
-            
-            return file_id
-            
+        return len(file_ids)
+    
+    def _index_error(self, filepath, e):
+        """Report a file that failed to index"""
+        print(f"Error indexing {filepath}: {e}")
+        self.log_activity(
+            "Error",
+            os.path.basename(filepath),
+            f"Failed to index: {str(e)}"
+        )
+    
+    def index_file(self, filepath, stat=None):
+        """
+        Index a single file
+        
+        `stat` is the file's os.stat result if the caller already has it
+        (e.g. from iter_indexable), so the file isn't stat'ed again.
+        """
+        try:
+            existing = self.db.get_file_state(filepath)
+            file_info = self._read_file_info(filepath, existing, stat)
+            if file_info is None:
+                return None
+            return self._store_file_info(file_info, existing)
         except Exception as e:
-            print(f"Error indexing {filepath}: {e}")
-            self.log_activity(
-                "Error",
-                os.path.basename(filepath),
-                f"Failed to index: {str(e)}"
-            )
+            self._index_error(filepath, e)
             return None
     
+    def iter_indexable(self, root, recursive=True):
+        """
+        Yield (path, stat) for the files under root worth indexing
+        
+        Walks with os.scandir, so file/folder checks come from the
+        directory listing, and hands on the one stat taken per file.
+        Folders are listed on SCAN_WORKERS threads, a few at a time ahead
+        of the caller. Hidden files and folders and files over the size
+        limit are left out; subfolders that can't be read are skipped.
+        """
+        pool = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix='fo-scan')
+        try:
+            folders = []
+            root_listing = pool.submit(self._list_folder, root, recursive)
+            pending = deque([root_listing])
+            while pending:
+                listing = pending.popleft()
+                try:
+                    files, subfolders = listing.result()
+                except OSError:
+                    if listing is root_listing:
+                        raise
+                    continue
+                folders.extend(subfolders)
+                while folders and len(pending) < SCAN_WORKERS * 2:
+                    pending.append(pool.submit(self._list_folder, folders.pop(), recursive))
+                yield from files
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _list_folder(self, folder, recursive):
+        """One folder for iter_indexable: ([(path, stat)], [subfolder])"""
+        files = []
+        subfolders = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name[0] == '.':
+                    continue
+                try:
+                    if _WINDOWS_HIDDEN and entry.stat(follow_symlinks=False).st_file_attributes & _WINDOWS_HIDDEN:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and entry.name != '__MACOSX':
+                            subfolders.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        if stat.st_size <= MAX_INDEX_FILE_SIZE:
+                            files.append((entry.path, stat))
+                except OSError:
+                    continue
+        return files, subfolders
+    
+    def _submit_reads(self, pool, entries, known=None):
+        """
+        Yield (filepath, existing, future) for (path, stat) entries, in order
+        
+        Keeps up to INDEX_READ_AHEAD files being read on the pool; the
+        stored state comes from `known` (see get_file_states) if given,
+        else is looked up here, on the caller's thread.
+        """
+        pending = deque()
+        for filepath, stat in entries:
+            if known is not None:
+                existing = known.get(filepath)
+            else:
+                existing = self.db.get_file_state(filepath)
+            pending.append((filepath, existing, pool.submit(self._read_file_info, filepath, existing, stat)))
+            if len(pending) >= INDEX_READ_AHEAD:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+    
+    def index_paths(self, paths):
+        """
+        Index many files, committing once per INDEX_BATCH_SIZE files
+        
+        Hashing and text extraction run on a thread pool (file I/O and
+        hashing release the GIL); database writes stay on this thread.
+        
+        Returns:
+            (indexed_count, skipped_count)
+        """
+        return self.index_entries((filepath, None) for filepath in paths)
+    
+    def index_entries(self, entries, known=None):
+        """
+        index_paths for (path, stat) pairs, as yielded by iter_indexable
+        
+        stat may be None, in which case the file is stat'ed when read.
+        `known` is the stored state of the files, from get_file_states,
+        if it was loaded up front.
+        """
+        indexed_count = 0
+        skipped_count = 0
+        
+        with ThreadPoolExecutor(max_workers=INDEX_WORKERS) as pool:
+            reads = self._submit_reads(pool, entries, known)
+            while True:
+                # Read a batch's worth of files, then write them in one
+                # transaction (so the write lock isn't held while waiting
+                # on the reads)
+                processed = 0
+                touched = []
+                to_add = []
+                for filepath, existing, future in reads:
+                    try:
+                        file_info = future.result()
+                        if file_info is None:
+                            skipped_count += 1
+                        elif existing and existing[2] == file_info['file_hash']:
+                            # Touched, not changed (see _store_file_info)
+                            touched.append((file_info, existing))
+                            skipped_count += 1
+                        else:
+                            to_add.append(file_info)
+                    except Exception as e:
+                        self._index_error(filepath, e)
+                        skipped_count += 1
+                    processed += 1
+                    if processed == INDEX_BATCH_SIZE:
+                        break
+                
+                with self.db.batch():
+                    for file_info, existing in touched:
+                        try:
+                            self._store_file_info(file_info, existing)
+                        except Exception as e:
+                            self._index_error(file_info['path'], e)
+                    
+                    added = self._add_indexed_files(to_add)
+                    indexed_count += added
+                    skipped_count += len(to_add) - added
+                if processed < INDEX_BATCH_SIZE:
+                    break
+        
+        return indexed_count, skipped_count
+    
     def scan_folder(self, folder_path, recursive=True):
         """Scan a folder and index all files"""
         indexed_count = 0
@@ -825,28 +1507,14 @@ class FileIndexer:
         )
         
         try:
-            if recursive:
-                for root, dirs, files in os.walk(folder_path):
-                    # Skip hidden directories
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
-                    
-                    for filename in files:
-                        filepath = os.path.join(root, filename)
-                        result = self.index_file(filepath)
-                        if result:
-                            indexed_count += 1
-                        else:
-                            skipped_count += 1
-            else:
-                for filename in os.listdir(folder_path):
-                    filepath = os.path.join(folder_path, filename)
-                    if os.path.isfile(filepath):
-                        result = self.index_file(filepath)
-                        if result:
-                            indexed_count += 1
-                        else:
-                            skipped_count += 1
-        
+            # Stored state of everything under the folder in one query, so
+            # unchanged files are skipped without a lookup each
+            known = self.db.get_file_states(folder_path)
+            indexed_count, skipped_count = self.index_entries(
+                self.iter_indexable(folder_path, recursive), known
+            )
+            if indexed_count:
+                self.db.optimize()
         except Exception as e:
             print(f"Error scanning folder {folder_path}: {e}")
             self.log_activity("Error", os.path.basename(folder_path), f"Scan failed: {str(e)}")
@@ -5,10 +5,58 @@ Handles moving, renaming, organizing files with safety checks
 """
 
 import os
+import json
 import shutil
+import sqlite3
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+# Optional: trash files in-process instead of spawning osascript per file
+try:
+    from send2trash import send2trash
+    SEND2TRASH_AVAILABLE = True
+except ImportError:
+    SEND2TRASH_AVAILABLE = False
+
+
+# Subfolder organize_by_type sorts each file type into (lower-case
+# extensions, as frozensets for O(1) membership tests)
+TYPE_FOLDERS = {
+    'Documents': frozenset({'.pdf', '.doc', '.docx', '.txt', '.md', '.pages'}),
+    'Images': frozenset({'.jpg', '.jpeg', '.png', '.gif', '.heic', '.svg'}),
+    'Spreadsheets': frozenset({'.xlsx', '.xls', '.csv', '.numbers'}),
+    'Presentations': frozenset({'.pptx', '.ppt', '.key'}),
+    'Archives': frozenset({'.zip', '.rar', '.7z', '.tar', '.gz'}),
+    'Code': frozenset({'.py', '.js', '.html', '.css', '.json', '.xml'}),
+    'Videos': frozenset({'.mp4', '.mov', '.avi', '.mkv'}),
+    'Audio': frozenset({'.mp3', '.wav', '.m4a', '.flac'})
+}
+
+# Extension -> subfolder, so each file is classified with one dict lookup
+_EXT_TO_FOLDER = {ext: folder for folder, extensions in TYPE_FOLDERS.items() for ext in extensions}
+
+# Bulk organizes with at least PARALLEL_MOVES_MIN files move them on
+# MOVE_WORKERS threads; smaller ones aren't worth starting a pool
+MOVE_WORKERS = 8
+PARALLEL_MOVES_MIN = 16
+
+# Mark a trashed or deleted file's row
+_SQL_MARK_DELETED = "UPDATE files SET status = 'deleted' WHERE path = ?"
+
+# Point a moved file's row at its new location
+_SQL_UPDATE_MOVED = """
+    UPDATE files 
+    SET path = ?, folder_location = ?, filename = ?
+    WHERE path = ?
+"""
+
+
+def _applescript_escape(text):
+    """Escape text for use inside an AppleScript string literal"""
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
 
 class FileOperations:
     """Safe file operations with undo capability"""
@@ -39,13 +87,45 @@ class FileOperations:
         Returns:
             New file path if successful, None if failed
         """
+        dest_path, error = self._move_on_disk(source_path, dest_folder, new_name)
+        if dest_path is None:
+            return None, error
         
+        try:
+            # Update database
+            with self.db.write() as conn:
+                conn.execute(_SQL_UPDATE_MOVED, self._moved_row(source_path, dest_path))
+        except Exception as e:
+            return None, f"Error moving file: {str(e)}"
+        
+        return dest_path, None
+    
+    def _move_on_disk(self, source_path, dest_folder, new_name=None):
+        """move_file without the database update; returns (new path, error)"""
+        dest_path, error = self._plan_move(source_path, dest_folder, new_name)
+        if dest_path is None:
+            return None, error
+        
+        try:
+            self._rename(source_path, dest_path)
+        except Exception as e:
+            return None, f"Error moving file: {str(e)}"
+        
+        self._log_move(source_path, dest_path)
+        return dest_path, None
+    
+    def _plan_move(self, source_path, dest_folder, new_name=None, listings=None):
+        """
+        Pick the destination path for a move; returns (dest path, error)
+        
+        For bulk moves pass a dict as `listings`: each destination folder
+        is then listed once (see _folder_names), collisions are checked
+        against that instead of with a stat per file, and the chosen name
+        is reserved there for the rest of the run.
+        """
         if not os.path.exists(source_path):
             return None, f"Source file not found: {source_path}"
         
-        # Ensure destination folder exists
-        self.ensure_folder_exists(dest_folder)
-        
         # Determine destination filename
         if new_name:
             dest_filename = new_name
@@ -54,46 +134,135 @@ class FileOperations:
         
         dest_path = os.path.join(dest_folder, dest_filename)
         
-        # Check if destination already exists
-        if os.path.exists(dest_path):
-            # Add timestamp to avoid collision
+        # Ensure destination folder exists, and check if destination
+        # already exists
+        if listings is None:
+            self.ensure_folder_exists(dest_folder)
+            dest_names = None
+            taken = os.path.exists(dest_path)
+        else:
+            dest_names = self._folder_names(dest_folder, listings)
+            taken = dest_filename.casefold() in dest_names
+        
+        if taken:
+            # Add timestamp to avoid collision, plus a counter when several
+            # same-named files land here within the same second
             base, ext = os.path.splitext(dest_filename)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             dest_filename = f"{base}_{timestamp}{ext}"
             dest_path = os.path.join(dest_folder, dest_filename)
+            n = 1
+            while (os.path.exists(dest_path) if dest_names is None
+                   else dest_filename.casefold() in dest_names):
+                dest_filename = f"{base}_{timestamp}_{n}{ext}"
+                dest_path = os.path.join(dest_folder, dest_filename)
+                n += 1
+        
+        if dest_names is not None:
+            dest_names.add(dest_filename.casefold())
         
+        return dest_path, None
+    
+    @staticmethod
+    def _rename(source_path, dest_path):
+        """
+        Move the file: a plain rename (one syscall, no data copied) when it
+        stays on the same volume; shutil.move copies across volumes (EXDEV)
+        and handles anything else rename can't
+        """
         try:
-            # Move the file
+            os.rename(source_path, dest_path)
+        except OSError:
             shutil.move(source_path, dest_path)
-            
-            # Update database
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                UPDATE files 
-                SET path = ?, folder_location = ?, filename = ?
-                WHERE path = ?
-            """, (dest_path, dest_folder, dest_filename, source_path))
-            self.db.conn.commit()
-            
-            # Log activity
-            self.log_activity(
-                "Moved",
-                os.path.basename(source_path),
-                f"From: {os.path.dirname(source_path)}\nTo: {dest_folder}"
-            )
-            
-            # Save to history for undo
-            self.operation_history.append({
-                'type': 'move',
-                'source': source_path,
-                'dest': dest_path,
-                'timestamp': datetime.now()
-            })
-            
-            return dest_path, None
-            
-        except Exception as e:
-            return None, f"Error moving file: {str(e)}"
+    
+    def _log_move(self, source_path, dest_path):
+        """Activity log and undo history for a finished move"""
+        # Log activity
+        self.log_activity(
+            "Moved",
+            os.path.basename(source_path),
+            f"From: {os.path.dirname(source_path)}\nTo: {os.path.dirname(dest_path)}"
+        )
+        
+        # Save to history for undo
+        self.operation_history.append({
+            'type': 'move',
+            'source': source_path,
+            'dest': dest_path,
+            'timestamp': datetime.now()
+        })
+    
+    def _run_moves(self, planned, results):
+        """
+        Carry out (filename, source, dest) moves from _plan_move
+        
+        Big batches are moved MOVE_WORKERS at a time (the disk work
+        releases the GIL); logging and results stay on this thread.
+        Returns the (source, dest) pairs that were moved.
+        """
+        def attempt(move):
+            try:
+                self._rename(move[1], move[2])
+            except Exception as e:
+                return e
+            return None
+        
+        if len(planned) >= PARALLEL_MOVES_MIN:
+            with ThreadPoolExecutor(max_workers=MOVE_WORKERS) as pool:
+                errors = list(pool.map(attempt, planned))
+        else:
+            errors = [attempt(move) for move in planned]
+        
+        moves = []
+        for (filename, source_path, dest_path), error in zip(planned, errors):
+            if error is None:
+                self._log_move(source_path, dest_path)
+                moves.append((source_path, dest_path))
+                results['moved'] += 1
+            else:
+                results['errors'].append(f"{filename}: Error moving file: {str(error)}")
+                results['skipped'] += 1
+        return moves
+    
+    def _folder_names(self, folder, listings):
+        """
+        Case-folded names in folder, created if missing; listed once per
+        bulk operation and kept in `listings`
+        
+        Names are case-folded because macOS volumes are usually
+        case-insensitive: "Report.pdf" would overwrite "report.pdf".
+        """
+        names = listings.get(folder)
+        if names is None:
+            self.ensure_folder_exists(folder)
+            names = listings[folder] = {name.casefold() for name in os.listdir(folder)}
+        return names
+    
+    @staticmethod
+    def _moved_row(source_path, dest_path):
+        """Parameters for _SQL_UPDATE_MOVED"""
+        return (dest_path, os.path.dirname(dest_path), os.path.basename(dest_path), source_path)
+    
+    def _record_moves(self, moves, results):
+        """Update the rows of (source, dest) moves in one transaction"""
+        if not moves:
+            return
+        
+        rows = [self._moved_row(source, dest) for source, dest in moves]
+        try:
+            with self.db.write() as conn:
+                conn.executemany(_SQL_UPDATE_MOVED, rows)
+        except sqlite3.IntegrityError:
+            # A path clash (e.g. a stale row for a destination) rolled the
+            # whole batch back; redo it row by row so only that row fails
+            for row in rows:
+                try:
+                    with self.db.write() as conn:
+                        conn.execute(_SQL_UPDATE_MOVED, row)
+                except sqlite3.Error as e:
+                    results['errors'].append(f"{os.path.basename(row[3])}: moved but could not update the index: {e}")
+        except sqlite3.Error as e:
+            results['errors'].append(f"Moved {len(moves)} files but could not update the index: {e}")
     
     def rename_file(self, file_path, new_name):
         """
@@ -122,13 +291,12 @@ class FileOperations:
             os.rename(file_path, new_path)
             
             # Update database
-            cursor = self.db.conn.cursor()
-            cursor.execute("""
-                UPDATE files 
-                SET path = ?, filename = ?
-                WHERE path = ?
-            """, (new_path, new_name, file_path))
-            self.db.conn.commit()
+            with self.db.write() as conn:
+                conn.execute("""
+                    UPDATE files 
+                    SET path = ?, filename = ?
+                    WHERE path = ?
+                """, (new_path, new_name, file_path))
             
             # Log activity
             self.log_activity(
@@ -162,17 +330,6 @@ class FileOperations:
         if base_dest_folder is None:
             base_dest_folder = source_folder
         
-        type_folders = {
-            'Documents': ['.pdf', '.doc', '.docx', '.txt', '.md', '.pages'],
-            'Images': ['.jpg', '.jpeg', '.png', '.gif', '.heic', '.svg'],
-            'Spreadsheets': ['.xlsx', '.xls', '.csv', '.numbers'],
-            'Presentations': ['.pptx', '.ppt', '.key'],
-            'Archives': ['.zip', '.rar', '.7z', '.tar', '.gz'],
-            'Code': ['.py', '.js', '.html', '.css', '.json', '.xml'],
-            'Videos': ['.mp4', '.mov', '.avi', '.mkv'],
-            'Audio': ['.mp3', '.wav', '.m4a', '.flac']
-        }
-        
         results = {
             'moved': 0,
             'skipped': 0,
@@ -189,33 +346,40 @@ class FileOperations:
         
         files = cursor.fetchall()
         
+        # Moves are planned first, then carried out together, and their
+        # rows updated together at the end
+        planned = []
+        listings = {}
+        
+        # Every file here sits directly in source_folder, so whether it is
+        # already in its type's subfolder only depends on that folder's name
+        current_subfolder = os.path.basename(os.path.normpath(source_folder))
+        
         for file_path, filename, ext in files:
             if not ext:
                 results['skipped'] += 1
                 continue
             
             # Find appropriate folder
-            dest_subfolder = 'Other'
-            for folder_name, extensions in type_folders.items():
-                if ext.lower() in extensions:
-                    dest_subfolder = folder_name
-                    break
+            dest_subfolder = _EXT_TO_FOLDER.get(ext.lower(), 'Other')
             
             # Don't move if already in correct subfolder
-            if os.path.basename(os.path.dirname(file_path)) == dest_subfolder:
+            if dest_subfolder == current_subfolder:
                 results['skipped'] += 1
                 continue
             
             # Move file
             dest_folder = os.path.join(base_dest_folder, dest_subfolder)
-            new_path, error = self.move_file(file_path, dest_folder)
+            dest_path, error = self._plan_move(file_path, dest_folder, listings=listings)
             
-            if new_path:
-                results['moved'] += 1
+            if dest_path:
+                planned.append((filename, file_path, dest_path))
             else:
                 results['errors'].append(f"{filename}: {error}")
                 results['skipped'] += 1
         
+        moves = self._run_moves(planned, results)
+        self._record_moves(moves, results)
         return results
     
     def organize_by_project(self, files_to_organize, user_profile):
@@ -241,16 +405,35 @@ class FileOperations:
             'errors': []
         }
         
+        projects = set(projects)
+        planned = []
+        listings = {}
+        
+        # Get file info for all files at once: one query for ids, one for paths
+        ids = [ref for ref in files_to_organize if isinstance(ref, int)]
+        paths = [ref for ref in files_to_organize if not isinstance(ref, int)]
+        by_id = {}
+        by_path = {}
         cursor = self.db.conn.cursor()
+        if ids:
+            cursor.execute("""
+                SELECT id, path, filename, project FROM files
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(ids),))
+            by_id = {row[0]: row[1:] for row in cursor.fetchall()}
+        if paths:
+            cursor.execute("""
+                SELECT path, filename, project FROM files
+                WHERE path IN (SELECT value FROM json_each(?))
+            """, (json.dumps(paths),))
+            by_path = {row[0]: row for row in cursor.fetchall()}
         
         for file_ref in files_to_organize:
-            # Get file info
             if isinstance(file_ref, int):
-                cursor.execute("SELECT path, filename, project FROM files WHERE id = ?", (file_ref,))
+                result = by_id.get(file_ref)
             else:
-                cursor.execute("SELECT path, filename, project FROM files WHERE path = ?", (file_ref,))
+                result = by_path.get(file_ref)
             
-            result = cursor.fetchone()
             if not result:
                 results['skipped'] += 1
                 continue
@@ -263,14 +446,16 @@ class FileOperations:
             
             # Move to project folder
             project_folder = os.path.join(organized_folder, project)
-            new_path, error = self.move_file(file_path, project_folder)
+            dest_path, error = self._plan_move(file_path, project_folder, listings=listings)
             
-            if new_path:
-                results['moved'] += 1
+            if dest_path:
+                planned.append((filename, file_path, dest_path))
             else:
                 results['errors'].append(f"{filename}: {error}")
                 results['skipped'] += 1
         
+        moves = self._run_moves(planned, results)
+        self._record_moves(moves, results)
         return results
     
     def delete_file(self, file_path, permanent=False):
@@ -286,20 +471,11 @@ class FileOperations:
             return False, "File not found"
         
         try:
-            if permanent:
-                os.remove(file_path)
-                action = "Deleted (permanent)"
-            else:
-                # Move to trash (macOS)
-                from subprocess import run
-                run(['osascript', '-e', 
-                     f'tell application "Finder" to delete POSIX file "{file_path}"'])
-                action = "Moved to Trash"
+            action = self._delete_on_disk([file_path], permanent)
             
             # Update database
-            cursor = self.db.conn.cursor()
-            cursor.execute("UPDATE files SET status = 'deleted' WHERE path = ?", (file_path,))
-            self.db.conn.commit()
+            with self.db.write() as conn:
+                conn.execute(_SQL_MARK_DELETED, (file_path,))
             
             # Log activity
             self.log_activity(
@@ -312,7 +488,68 @@ class FileOperations:
             
         except Exception as e:
             return False, f"Error deleting file: {str(e)}"
-
+    
+    def delete_files(self, file_paths, permanent=False):
+        """
+        Delete many files (move to trash or permanent delete)
+        
+        Files are trashed together and their rows marked deleted in one
+        transaction.
+        
+        Returns:
+            {'deleted': count, 'errors': [messages]}
+        """
+        results = {'deleted': 0, 'errors': []}
+        
+        existing = []
+        for file_path in file_paths:
+            if os.path.exists(file_path):
+                existing.append(file_path)
+            else:
+                results['errors'].append(f"{os.path.basename(file_path)}: File not found")
+        if not existing:
+            return results
+        
+        try:
+            action = self._delete_on_disk(existing, permanent)
+        except Exception as e:
+            results['errors'].append(f"Error deleting files: {str(e)}")
+            # Only the files that actually went can be marked deleted
+            existing = [path for path in existing if not os.path.exists(path)]
+            action = "Deleted (permanent)" if permanent else "Moved to Trash"
+        
+        try:
+            with self.db.write() as conn:
+                conn.executemany(_SQL_MARK_DELETED, [(path,) for path in existing])
+        except sqlite3.Error as e:
+            results['errors'].append(f"Deleted {len(existing)} files but could not update the index: {e}")
+        
+        for file_path in existing:
+            self.log_activity(
+                action,
+                os.path.basename(file_path),
+                f"From: {os.path.dirname(file_path)}"
+            )
+        
+        results['deleted'] = len(existing)
+        return results
+    
+    def _delete_on_disk(self, file_paths, permanent):
+        """Remove or trash files; returns the activity log action"""
+        if permanent:
+            for file_path in file_paths:
+                os.remove(file_path)
+            return "Deleted (permanent)"
+        
+        if SEND2TRASH_AVAILABLE:
+            for file_path in file_paths:
+                send2trash(file_path)
+        else:
+            # Move to trash (macOS), all files in one Finder call
+            posix_files = ', '.join(f'POSIX file "{_applescript_escape(path)}"' for path in file_paths)
+            subprocess.run(['osascript', '-e',
+                            f'tell application "Finder" to delete {{{posix_files}}}'])
+        return "Moved to Trash"
 
 if __name__ == "__main__":
     # Test file operations
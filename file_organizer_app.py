@@ -15,33 +15,64 @@ from conversational_ai import ConversationalAI
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, 
     QHBoxLayout, QTextEdit, QLineEdit, QPushButton,
-    QTabWidget, QSystemTrayIcon, QMenu, QTableWidget,
-    QTableWidgetItem, QHeaderView, QLabel, QGroupBox,
+    QTabWidget, QSystemTrayIcon, QMenu, QTableView,
+    QHeaderView, QLabel, QGroupBox,
     QColorDialog, QFontDialog, QScrollArea, QComboBox, 
     QCheckBox, QMessageBox
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt6.QtGui import QIcon, QTextCursor, QFont
+from PyQt6.QtCore import (
+    Qt, QThread, pyqtSignal, QTimer, QAbstractTableModel, QModelIndex,
+    QSignalBlocker
+)
+from PyQt6.QtGui import QIcon, QTextCursor, QFont, QTextCharFormat, QColor
 import datetime
 import json
+import re
+from collections import deque
+
+
+# Action tags the assistant embeds in its replies
+SEARCH_TAG_RE = re.compile(r'\[SEARCH:\s*([^\]]+)\]')
+INDEX_TAG_RE = re.compile(r'\[INDEX:\s*([^\]]+)\]')
+ORGANIZE_TAG_RE = re.compile(r'\[ORGANIZE:\s*([^\]]+)\]')
+
+# Keywords that mark a message as a search or organize request (matched
+# anywhere in the lower-cased message, like a substring test)
+SEARCH_KEYWORDS_RE = re.compile('|'.join(map(re.escape, [
+    'find', 'search', 'look for', 'where', 'show me',
+    'locate', 'get me', 'pull up', 'need', 'looking for'
+])))
+ORGANIZE_KEYWORDS_RE = re.compile('|'.join(map(re.escape, [
+    'move', 'organize', 'rename', 'delete', 'sort',
+    'put', 'file', 'clean up', 'tidy'
+])))
 
 class OllamaThread(QThread):
     """Background thread for Ollama API calls with enhanced AI"""
     response_ready = pyqtSignal(dict)  # Changed to dict to pass more info
+    token_received = pyqtSignal(str)  # Reply text as it streams in
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, conversational_ai, message, conversation_history):
+    def __init__(self, conversational_ai, message, conversation_history, dragged_files=None):
         super().__init__()
         self.conversational_ai = conversational_ai
         self.message = message
         self.conversation_history = conversation_history
+        self.dragged_files = dragged_files or []
     
     def run(self):
         try:
+            # Add file context if files were dragged (looked up here so
+            # the database reads don't block the UI)
+            if self.dragged_files:
+                file_context = self.conversational_ai.build_file_context(self.dragged_files)
+                self.message = f"{self.message}\n\n[FILES PROVIDED BY USER:\n{file_context}]"
+            
             # Use enhanced conversational AI
             result = self.conversational_ai.chat(
                 self.message,
-                self.conversation_history
+                self.conversation_history,
+                on_token=self.token_received.emit
             )
             
             self.response_ready.emit(result)
@@ -50,20 +81,70 @@ class OllamaThread(QThread):
             self.error_occurred.emit(f"Error: {str(e)}")
 
 
+class ActivityLogModel(QAbstractTableModel):
+    """Activity log rows as plain (time, action, file, details) tuples"""
+    
+    HEADERS = ["Time", "Action", "File", "Details"]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # A list rather than a deque: data() indexes rows at random
+        self._rows = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self._rows[index.row()][index.column()]
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def append_rows(self, rows):
+        """Append rows with a single insert notification"""
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+
 class ActivityLogWidget(QWidget):
     """Tab for showing file organization activity"""
     
+    # Queued entries are moved into the table this often; at most
+    # MAX_PENDING wait at a time (the oldest are dropped beyond that)
+    FLUSH_INTERVAL_MS = 250
+    MAX_PENDING = 10000
+    
     def __init__(self):
         super().__init__()
+        # Entries from add_activity, which scans and bulk moves call once
+        # per file (possibly off the GUI thread); the timer adds them to
+        # the table in one go instead of a table update per file
+        self._pending = deque(maxlen=self.MAX_PENDING)
         self.init_ui()
         
+        self._flush_timer = QTimer(self)
+        self._flush_timer.timeout.connect(self.flush_activity)
+        self._flush_timer.start(self.FLUSH_INTERVAL_MS)
+        
     def init_ui(self):
         layout = QVBoxLayout()
         
-        # Activity table
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Time", "Action", "File", "Details"])
+        # Activity table (a view over ActivityLogModel, so rows cost a
+        # tuple each instead of four table items)
+        self.model = ActivityLogModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         
         # Make columns resize appropriately
         header = self.table.horizontalHeader()
@@ -76,16 +157,20 @@ class ActivityLogWidget(QWidget):
         self.setLayout(layout)
     
     def add_activity(self, action, filename, details):
-        """Add an activity log entry"""
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        
+        """Add an activity log entry (shown on the next flush)"""
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        self._pending.append((timestamp, action, filename, details))
+    
+    def flush_activity(self):
+        """Move queued activity entries into the table"""
+        if not self._pending:
+            return
+        
+        entries = []
+        while self._pending:
+            entries.append(self._pending.popleft())
         
-        self.table.setItem(row, 0, QTableWidgetItem(timestamp))
-        self.table.setItem(row, 1, QTableWidgetItem(action))
-        self.table.setItem(row, 2, QTableWidgetItem(filename))
-        self.table.setItem(row, 3, QTableWidgetItem(details))
+        self.model.append_rows(entries)
         
         # Scroll to bottom
         self.table.scrollToBottom()
@@ -94,6 +179,10 @@ class ActivityLogWidget(QWidget):
 class ChatWidget(QWidget):
     """Main chat interface with enhanced conversational AI"""
     
+    # Scrollback limit: the display drops its oldest lines beyond this,
+    # so appending stays cheap however long the session runs
+    MAX_CHAT_BLOCKS = 2000
+    
     def __init__(self, activity_log, user_profile=None, file_db=None, file_ops=None):
         super().__init__()
         self.model = "llama3.2:3b"
@@ -113,161 +202,27 @@ class ChatWidget(QWidget):
         # Store for dragged files
         self.dragged_files = []
         
-        # Simplified conversation history (system prompt now handled by ConversationalAI)
-        self.conversation_history = []
-        
-        self.init_ui()
-    
-    def build_system_prompt_legacy(self):
-        """Build personalized system prompt from user profile"""
-        
-        # Get settings
-        settings = self.user_profile.get('settings', {})
-        assistant_name = settings.get('assistant_name', 'Assistant')
-        tone = settings.get('tone', 'Casual & Friendly')
-        
-        if not self.user_profile:
-            # Default prompt if no profile
-            return f"""You are {assistant_name}, a helpful file organization assistant built into a macOS menu bar app. 
-
-Your user struggles with file organization - files pile up everywhere with chaotic naming and no structure.
-
-Your job is to:
-- Help them find files through natural conversation
-- Suggest ways to organize their files
-- Be encouraging and understanding about the chaos
-- Keep responses concise and practical
-
-Currently you're in chat-only mode. Soon you'll be able to actually search and organize their files. For now, just chat naturally and help them think through their organization strategy.
-
-Be warm, casual, and friendly - no judgment, just helpful."""
-        
-        # Personalized prompt
-        name = self.user_profile.get("name", "there")
-        job = self.user_profile.get("job", "")
-        industry = self.user_profile.get("industry", "")
-        projects = self.user_profile.get("projects", [])
-        folders = self.user_profile.get("monitored_folders", [])
-        file_types = self.user_profile.get("file_types", [])
-        org_style = self.user_profile.get("organization_style", "project")
-        pain_points = self.user_profile.get("pain_points", "")
-        
-        prompt = f"""You are {assistant_name}, {name}'s personal file organization assistant, built into a macOS menu bar app.
-
-ABOUT {name.upper()}:
-- Job/Role: {job}"""
-        
-        if industry and industry != "Not specified":
-            prompt += f"\n- Industry: {industry}"
+        # Organize request waiting for the user's yes/no (None when there isn't one)
+        self.pending_organize = None
         
-        if projects:
-            prompt += f"\n- Main projects/clients: {', '.join(projects)}"
+        # Simplified conversation history (system prompt now handled by ConversationalAI),
+        # keeping the last 20 messages
+        self.conversation_history = deque(maxlen=20)
         
-        if folders:
-            prompt += f"\n- Monitored folders: {', '.join(folders)}"
+        # Cursor parked where the streaming reply starts (None when no
+        # reply is streaming); handle_response replaces the streamed text
+        # with the final, tag-processed message
+        self._stream_start = None
+        self._stream_format = QTextCharFormat()
+        self._stream_format.setForeground(QColor("#009900"))
         
-        if file_types:
-            prompt += f"\n- Works with: {', '.join(file_types)}"
-        
-        prompt += f"\n- Thinks about files: By {org_style}"
-        
-        if pain_points:
-            prompt += f"\n\nTHEIR BIGGEST CHALLENGE:\n{pain_points}"
-        
-        prompt += f"""
-
-YOUR JOB:
-- Help {name} find files through natural conversation
-- Suggest organization strategies that fit THEIR way of thinking
-- Be encouraging and understanding - they struggle with organization
-- Keep responses concise and practical
-- Remember their projects/clients when they mention them
-
-CURRENT STATUS:
-You can search through their indexed files AND help organize them through natural conversation!
-
-HOW TO INTERACT:
-- Chat naturally - don't just execute commands robotically
-- Ask clarifying questions when needed
-- Suggest what you could do based on what they're saying
-- Confirm before taking ANY file action (moving, renaming, deleting)
-- Explain what you're about to do and why
-
-EXAMPLES OF GOOD INTERACTIONS:
-
-User: "I need to find something"
-You: "Sure! What are you looking for? A specific file name, project, or type of document?"
-
-User: "my downloads are a mess"  
-You: "I can help! I have [number] files indexed in your Downloads. Want me to organize them by type (PDFs together, images together, etc.) or would you prefer a different approach?"
-
-User: "organize my downloads"
-You: "I can sort your Downloads into folders by file type - Documents, Images, Spreadsheets, Archives, etc. Should I go ahead with that? (It won't delete anything, just organize into subfolders)"
-
-User: "yes"
-You: [Actually execute the organization and report results]
-
-SEARCHING:
-When they want to find files, search the database naturally:
-- "find my outline" → search for "outline"  
-- "where's that Phoenix doc?" → search for "Phoenix"
-
-Then tell them what you found conversationally, not like a robot listing results.
-
-EXECUTING ACTIONS:
-When you've confirmed with the user and they say yes/ok/sure/go ahead, you can execute actions:
-
-To search: Add [SEARCH: query terms] in your response
-Example: "Let me find that for you! [SEARCH: outline]"
-
-To organize: Add [ORGANIZE: downloads] or [ORGANIZE: desktop] in your response  
-Example: "I'll organize your Downloads now! [ORGANIZE: downloads]"
-
-The system will execute the action and add results to your response automatically.
-
-IMPORTANT: Only use action tags AFTER getting user confirmation!
-
-DRAG & DROP FILES:
-Users can drag files directly into the chat! When they do, you'll receive:
-- File path, name, and metadata
-- AI-generated summary and tags (if available)
-- Project associations
-
-Use this context to answer questions like:
-- "What is this file about?"
-- "Find files related to this"
-- "Which project does this belong to?"
-- "Move this to [folder]"
-- "Summarize this document"
-
-Always acknowledge the file they dropped and respond based on what they're asking about it.
-
-TONE:
-Be warm, casual, and friendly - like a helpful friend who gets it. No judgment, just helpful. Use their name occasionally to make it personal.
-
-CONVERSATION STYLE ({tone}):"""
-        
-        if tone == "Casual & Friendly":
-            prompt += """
-- Keep it relaxed and conversational
-- Use casual language, contractions, occasional humor
-- Be encouraging and supportive
-- It's okay to be playful"""
-        elif tone == "Professional":
-            prompt += """
-- Maintain professionalism while being helpful
-- Use clear, precise language
-- Focus on efficiency and results
-- Be respectful and courteous"""
-        elif tone == "Concise":
-            prompt += """
-- Keep responses brief and to the point
-- No unnecessary pleasantries
-- Focus on actionable information
-- Direct and efficient communication"""
-        
-        return prompt
+        # Set while a scroll to the end is queued; appends and streamed
+        # tokens arriving in the meantime share that one scroll
+        self._scroll_pending = False
         
+        self.refresh_settings()
+        self.init_ui()
+    
     def init_ui(self):
         layout = QVBoxLayout()
         
@@ -276,6 +231,7 @@ CONVERSATION STYLE ({tone}):"""
         self.chat_display.setReadOnly(True)
         font = QFont("Menlo", 11)
         self.chat_display.setFont(font)
+        self.chat_display.document().setMaximumBlockCount(self.MAX_CHAT_BLOCKS)
         
         # Input area
         input_layout = QHBoxLayout()
@@ -300,33 +256,50 @@ CONVERSATION STYLE ({tone}):"""
         # Welcome message
         self.append_message("Assistant", "Hey! I'm your file organizer assistant. I know things are probably chaotic right now - files everywhere, can't find anything. That's exactly what I'm here to help with. Right now we can chat and plan your organization strategy. Soon I'll be able to actually search and organize your files for you. What's the biggest pain point with your files right now?")
     
+    def refresh_settings(self):
+        """Re-read the display settings messages use (call after the profile changes)"""
+        settings = self.user_profile.get('settings', {})
+        self.assistant_name = settings.get('assistant_name', 'Assistant')
+        self.time_format = "%I:%M %p" if settings.get('time_12hr', True) else "%H:%M"
+    
+    def message_timestamp(self):
+        """Current time in the user's preferred format"""
+        return datetime.datetime.now().strftime(self.time_format)
+    
     def append_message(self, sender, message):
         """Add a message to the chat display"""
-        # Get time format preference
-        settings = self.user_profile.get('settings', {})
-        use_12hr = settings.get('time_12hr', True)
-        
-        if use_12hr:
-            timestamp = datetime.datetime.now().strftime("%I:%M %p")
-        else:
-            timestamp = datetime.datetime.now().strftime("%H:%M")
-        
-        # Get assistant name
-        assistant_name = settings.get('assistant_name', 'Assistant')
+        timestamp = self.message_timestamp()
         
         if sender == "You":
             formatted = f'<div style="color: #0066cc;"><b>[{timestamp}] You:</b> {message}</div>'
         else:
-            formatted = f'<div style="color: #009900;"><b>[{timestamp}] {assistant_name}:</b> {message}</div>'
+            formatted = f'<div style="color: #009900;"><b>[{timestamp}] {self.assistant_name}:</b> {message}</div>'
         
-        self.chat_display.append(formatted)
-        self.chat_display.append("")  # Empty line for spacing
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        self.insert_message_html(cursor, formatted)
+        cursor.insertBlock()  # Empty line for spacing
         
-        # Scroll to bottom
+        self.scroll_to_bottom()
+    
+    def scroll_to_bottom(self):
+        """Scroll the chat to its end once the current burst of appends is done"""
+        if not self._scroll_pending:
+            self._scroll_pending = True
+            QTimer.singleShot(0, self._do_scroll)
+    
+    def _do_scroll(self):
+        self._scroll_pending = False
         cursor = self.chat_display.textCursor()
         cursor.movePosition(QTextCursor.MoveOperation.End)
         self.chat_display.setTextCursor(cursor)
     
+    def insert_message_html(self, cursor, html):
+        """Insert html as a new paragraph at cursor (the document's end)"""
+        if not self.chat_display.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertHtml(html)
+    
     def dragEnterEvent(self, event):
         """Handle drag enter"""
         if event.mimeData().hasUrls():
@@ -365,9 +338,14 @@ CONVERSATION STYLE ({tone}):"""
         # Check for force execute shortcut (Cmd+Enter will be handled separately)
         force_execute = False
         
-        # Clear input
-        self.input_field.clear()
-        self.input_field.setPlaceholderText("Ask me anything about your files...")
+        # Clear and disable input while processing (signals blocked: nothing
+        # listens for these changes, so there's no need to emit them)
+        with QSignalBlocker(self.input_field), QSignalBlocker(self.send_button):
+            self.input_field.clear()
+            self.input_field.setPlaceholderText("Ask me anything about your files...")
+            self.input_field.setEnabled(False)
+            self.send_button.setEnabled(False)
+            self.send_button.setText("Thinking...")
         
         # Show user message
         self.append_message("You", message)
@@ -379,109 +357,30 @@ CONVERSATION STYLE ({tone}):"""
             message[:50] + ("..." if len(message) > 50 else "")
         )
         
-        # Add file context if files were dragged
-        if self.dragged_files:
-            file_context = self.build_file_context()
-            message = f"{message}\n\n[FILES PROVIDED BY USER:\n{file_context}]"
-            self.dragged_files = []  # Clear after use
-        
-        # Disable input while processing
-        self.input_field.setEnabled(False)
-        self.send_button.setEnabled(False)
-        self.send_button.setText("Thinking...")
+        # Remembered for the conversation history (the input field is
+        # already cleared by the time the reply arrives)
+        self._last_user_message = message
         
         # Start Ollama thread with enhanced AI
         self.ollama_thread = OllamaThread(
             self.conversational_ai,
             message,
-            self.conversation_history
+            tuple(self.conversation_history),
+            self.dragged_files
         )
+        self.dragged_files = []  # Clear after use
         self.ollama_thread.response_ready.connect(self.handle_response)
+        self.ollama_thread.token_received.connect(self.handle_token)
         self.ollama_thread.error_occurred.connect(self.handle_error)
         self.ollama_thread.start()
     
-    def enrich_message_with_context(self, message):
-        """Add available capabilities and file info to the message context"""
-        
-        # Start with the original message
-        enriched = message
-        
-        # Add available capabilities
-        capabilities = "\n\n[SYSTEM: Available capabilities:\n"
-        
-        if self.file_db:
-            # Get quick stats
-            stats = self.file_db.get_stats()
-            capabilities += f"- SEARCH: Can search {stats['total_files']} indexed files by name, content, tags, or project\n"
-        
-        if self.file_ops:
-            capabilities += "- ORGANIZE: Can move/rename files, organize by type or project\n"
-            capabilities += "- Available folders to organize: Downloads, Desktop, Documents\n"
-        
-        # Check if message seems to reference specific files
-        if 'this' in message.lower() or 'that' in message.lower() or 'these' in message.lower():
-            capabilities += "- Note: If user says 'this' or 'that' file, ask them to be more specific\n"
-        
-        capabilities += "]\n"
-        
-        return enriched + capabilities
-    
-    def build_file_context(self):
-        """Build context about dragged files from database"""
-        context = ""
-        
-        for file_path in self.dragged_files:
-            filename = os.path.basename(file_path)
-            
-            # Try to get file info from database
-            cursor = self.file_db.conn.cursor()
-            cursor.execute("""
-                SELECT filename, extension, ai_summary, ai_tags, project, 
-                       folder_location, modified_date
-                FROM files WHERE path = ?
-            """, (file_path,))
-            
-            result = cursor.fetchone()
-            
-            if result:
-                fname, ext, summary, tags, project, folder, modified = result
-                context += f"- {fname}\n"
-                context += f"  Path: {file_path}\n"
-                if summary:
-                    context += f"  Summary: {summary}\n"
-                if tags:
-                    context += f"  Tags: {tags}\n"
-                if project:
-                    context += f"  Project: {project}\n"
-                context += f"  Location: {folder}\n"
-                context += f"  Modified: {modified}\n"
-            else:
-                # File not in database yet
-                context += f"- {filename}\n"
-                context += f"  Path: {file_path}\n"
-                context += f"  (Not yet indexed - run a scan to analyze this file)\n"
-            
-            context += "\n"
-        
-        return context
-    
     def should_search(self, message):
         """Detect if message is a search request"""
-        search_keywords = [
-            'find', 'search', 'look for', 'where', 'show me',
-            'locate', 'get me', 'pull up', 'need', 'looking for'
-        ]
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in search_keywords)
+        return SEARCH_KEYWORDS_RE.search(message.lower()) is not None
     
     def should_organize(self, message):
         """Detect if message is a file organization request"""
-        organize_keywords = [
-            'move', 'organize', 'rename', 'delete', 'sort',
-            'put', 'file', 'clean up', 'tidy'
-        ]
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in organize_keywords)
+        return ORGANIZE_KEYWORDS_RE.search(message.lower()) is not None
     
     def handle_search_request(self, message):
         """Handle file search"""
@@ -517,18 +416,36 @@ CONVERSATION STYLE ({tone}):"""
         
         self.append_message("Assistant", response)
     
+    def match_organize_intent(self, message_lower):
+        """
+        Classify a lower-cased organize message
+        
+        Returns 'confirm' or 'deny' (only while an organize request is
+        pending), 'downloads', 'desktop' or 'project', or None.
+        """
+        if self.pending_organize is not None:
+            if any(word in message_lower for word in ('yes', 'ok', 'sure', 'go ahead')):
+                return 'confirm'
+            if any(word in message_lower for word in ('no', 'cancel', 'nevermind')):
+                return 'deny'
+        
+        if 'organize' in message_lower:
+            for intent, keyword in (('downloads', 'download'), ('desktop', 'desktop'), ('project', 'project')):
+                if keyword in message_lower:
+                    return intent
+        
+        return None
+    
     def handle_organize_request(self, message):
         """Handle file organization commands"""
-        import os
-        
-        message_lower = message.lower()
+        intent = self.match_organize_intent(message.lower())
         
         # Check if user is confirming a previous organize request
-        if hasattr(self, 'pending_organize'):
-            if 'yes' in message_lower or 'ok' in message_lower or 'sure' in message_lower or 'go ahead' in message_lower:
+        if intent in ('confirm', 'deny'):
+            if intent == 'confirm':
                 # Execute the pending operation
                 pending = self.pending_organize
-                delattr(self, 'pending_organize')
+                self.pending_organize = None
                 
                 if pending['type'] == 'downloads':
                     downloads = os.path.expanduser("~/Downloads")
@@ -584,13 +501,13 @@ CONVERSATION STYLE ({tone}):"""
                     self.append_message("Assistant", response)
                     return
                     
-            elif 'no' in message_lower or 'cancel' in message_lower or 'nevermind' in message_lower:
-                delattr(self, 'pending_organize')
+            else:
+                self.pending_organize = None
                 self.append_message("Assistant", "No problem! Let me know if you want to organize something else.")
                 return
         
         # Organize Downloads by type
-        if 'organize' in message_lower and 'download' in message_lower:
+        if intent == 'downloads':
             self.pending_organize = {'type': 'downloads'}
             self.append_message("Assistant", 
                 "I can organize your Downloads folder by sorting files into subfolders:\n\n"
@@ -605,7 +522,7 @@ CONVERSATION STYLE ({tone}):"""
             return
         
         # Organize Desktop by type
-        if 'organize' in message_lower and 'desktop' in message_lower:
+        if intent == 'desktop':
             self.pending_organize = {'type': 'desktop'}
             self.append_message("Assistant", 
                 "I can organize your Desktop by sorting files into subfolders by type "
@@ -615,7 +532,7 @@ CONVERSATION STYLE ({tone}):"""
             return
         
         # Organize by project
-        if 'organize' in message_lower and 'project' in message_lower:
+        if intent == 'project':
             # Check if we have project-tagged files
             cursor = self.file_db.conn.cursor()
             cursor.execute("""
@@ -649,8 +566,39 @@ CONVERSATION STYLE ({tone}):"""
             "Which would you like to try?"
         )
     
+    def handle_token(self, token):
+        """Show a streamed reply token as it arrives"""
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        
+        if self._stream_start is None:
+            # A cursor (unlike a plain position) follows the text when old
+            # lines are trimmed off the top of the document
+            self._stream_start = QTextCursor(cursor)
+            self._stream_start.setKeepPositionOnInsert(True)
+            self.insert_message_html(
+                cursor,
+                f'<div style="color: #009900;"><b>[{self.message_timestamp()}] {self.assistant_name}:</b> </div>'
+            )
+        
+        cursor.insertText(token, self._stream_format)
+        self.scroll_to_bottom()
+    
+    def clear_streamed_reply(self):
+        """Remove the streamed reply text, if any, from the chat display"""
+        if self._stream_start is None:
+            return
+        
+        cursor = self._stream_start
+        cursor.setPosition(cursor.position())  # Only the position stayed put
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self._stream_start = None
+    
     def handle_response(self, result):
         """Handle enhanced AI response"""
+        self.clear_streamed_reply()
+        
         # Extract response and metadata
         response = result.get('response', '')
         intent = result.get('intent', '')
@@ -664,18 +612,13 @@ CONVERSATION STYLE ({tone}):"""
         )
         
         # Add to conversation history (simplified format)
-        self.conversation_history.append({"role": "user", "content": self.input_field.text()})
+        self.conversation_history.append({"role": "user", "content": self._last_user_message})
         self.conversation_history.append({"role": "assistant", "content": response})
         
-        # Keep conversation history manageable (last 20 messages)
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
-        
         # Check if AI wants to execute an action
         if "[SEARCH:" in response:
             # AI wants to search - extract query
-            import re
-            match = re.search(r'\[SEARCH:\s*([^\]]+)\]', response)
+            match = SEARCH_TAG_RE.search(response)
             if match:
                 query = match.group(1).strip()
                 results = self.file_db.search_files(query, limit=10)
@@ -685,15 +628,16 @@ CONVERSATION STYLE ({tone}):"""
                 
                 # Format results
                 if results:
-                    search_results = f"\n\n📄 Found {len(results)} files:\n"
+                    parts = [f"\n\n📄 Found {len(results)} files:\n"]
                     for r in results[:5]:
-                        search_results += f"\n• {r['filename']}"
+                        parts.append(f"\n• {r['filename']}")
                         if r['ai_summary']:
-                            search_results += f"\n  {r['ai_summary']}"
-                        search_results += f"\n  📁 {r['folder_location']}\n"
+                            parts.append(f"\n  {r['ai_summary']}")
+                        parts.append(f"\n  📁 {r['folder_location']}\n")
                     
                     if len(results) > 5:
-                        search_results += f"\n...and {len(results) - 5} more"
+                        parts.append(f"\n...and {len(results) - 5} more")
+                    search_results = "".join(parts)
                     
                     # Learn from successful search
                     if len(results) > 0:
@@ -704,20 +648,18 @@ CONVERSATION STYLE ({tone}):"""
                     search_results = f"\n\n❌ No files found matching '{query}'"
                 
                 # Remove the [SEARCH:] tag and add results
-                response = re.sub(r'\[SEARCH:[^\]]+\]', '', response).strip()
+                response = SEARCH_TAG_RE.sub('', response).strip()
                 response += search_results
         
         if "[INDEX:" in response:
             # AI wants to index/scan - just acknowledge it
-            import re
-            import os
-            match = re.search(r'\[INDEX:\s*([^\]]+)\]', response)
+            match = INDEX_TAG_RE.search(response)
             if match:
                 folder_path = match.group(1).strip()
                 folder_name = os.path.basename(os.path.expanduser(folder_path))
                 
                 # Remove the [INDEX:] tag and tell user it's happening
-                response = re.sub(r'\[INDEX:[^\]]+\]', '', response).strip()
+                response = INDEX_TAG_RE.sub('', response).strip()
                 response += f"\n\n⏳ Indexing {folder_name} in background... Check Activity Log for progress!"
                 
                 # Note: Actual indexing should be done via Settings button or CLI
@@ -725,13 +667,11 @@ CONVERSATION STYLE ({tone}):"""
         
         if "[ORGANIZE:" in response:
             # AI wants to organize - extract type
-            import re
-            match = re.search(r'\[ORGANIZE:\s*([^\]]+)\]', response)
+            match = ORGANIZE_TAG_RE.search(response)
             if match:
                 org_type = match.group(1).strip().lower()
                 
                 if 'downloads' in org_type:
-                    import os
                     downloads = os.path.expanduser("~/Downloads")
                     results = self.file_ops.organize_by_type(downloads)
                     
@@ -739,11 +679,10 @@ CONVERSATION STYLE ({tone}):"""
                     org_results += f"• Moved: {results['moved']} files\n"
                     org_results += f"• Skipped: {results['skipped']} files\n"
                     
-                    response = re.sub(r'\[ORGANIZE:[^\]]+\]', '', response).strip()
+                    response = ORGANIZE_TAG_RE.sub('', response).strip()
                     response += org_results
                 
                 elif 'desktop' in org_type:
-                    import os
                     desktop = os.path.expanduser("~/Desktop")
                     results = self.file_ops.organize_by_type(desktop)
                     
@@ -751,7 +690,7 @@ CONVERSATION STYLE ({tone}):"""
                     org_results += f"• Moved: {results['moved']} files\n"
                     org_results += f"• Skipped: {results['skipped']} files\n"
                     
-                    response = re.sub(r'\[ORGANIZE:[^\]]+\]', '', response).strip()
+                    response = ORGANIZE_TAG_RE.sub('', response).strip()
                     response += org_results
         
         # Show response
@@ -765,6 +704,7 @@ CONVERSATION STYLE ({tone}):"""
     
     def handle_error(self, error_msg):
         """Handle errors"""
+        self._stream_start = None
         self.append_message("System", f"⚠️ {error_msg}")
         
         # Re-enable input
@@ -2006,6 +1946,7 @@ class MainWindow(QMainWindow):
         font = self.chat_widget.chat_display.font()
         font.setPointSize(font_size)
         self.chat_widget.chat_display.setFont(font)
+        self.chat_widget.refresh_settings()
         
         # Reload conversational AI with updated profile
         self.chat_widget.conversational_ai = ConversationalAI(
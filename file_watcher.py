@@ -13,6 +13,20 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 
+# Subfolders new Downloads/Desktop files are auto-organized into
+# (lower-case extensions, as frozensets for O(1) membership tests)
+CATEGORIES = {
+    'Documents': frozenset({'.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt'}),
+    'Images': frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.heic'}),
+    'Videos': frozenset({'.mp4', '.mov', '.avi', '.mkv', '.wmv'}),
+    'Music': frozenset({'.mp3', '.wav', '.flac', '.m4a', '.aac'}),
+    'Archives': frozenset({'.zip', '.tar', '.gz', '.rar', '.7z'}),
+    'Code': frozenset({'.py', '.js', '.html', '.css', '.java', '.cpp'}),
+    'Spreadsheets': frozenset({'.xlsx', '.xls', '.csv', '.ods'}),
+    'Presentations': frozenset({'.pptx', '.ppt', '.key', '.odp'})
+}
+
+
 class FileOrganizerHandler(FileSystemEventHandler):
     """Handle file system events"""
     
@@ -38,7 +52,11 @@ class FileOrganizerHandler(FileSystemEventHandler):
         # Wait a bit for file to be fully written
         time.sleep(0.5)
         
-        if not os.path.exists(filepath):
+        # One stat both checks the file is still there and is handed to
+        # the indexer, so it isn't stat'ed again
+        try:
+            stat = os.stat(filepath)
+        except OSError:
             self.processing.discard(filepath)
             return
         
@@ -49,18 +67,16 @@ class FileOrganizerHandler(FileSystemEventHandler):
             from file_indexer import FileIndexer
             indexer = FileIndexer(self.db)
             
-            file_info = indexer.extract_file_info(filepath)
-            if file_info:
-                file_id = self.db.add_file(file_info)
-                
+            file_id = indexer.index_file(filepath, stat)
+            if file_id:
                 # Auto-tag with AI
-                if self.ai_tagger and file_id:
+                if self.ai_tagger:
                     print(f"   🤖 AI tagging...")
                     self.ai_tagger.tag_file(file_id, filepath)
                 
                 # Auto-organize
                 if self.auto_organize:
-                    self._auto_organize(filepath, file_info)
+                    self._auto_organize(filepath, {'extension': os.path.splitext(filepath)[1]})
                 
                 print(f"   ✅ Processed: {Path(filepath).name}")
         
@@ -83,12 +99,12 @@ class FileOrganizerHandler(FileSystemEventHandler):
         result = cursor.fetchone()
         
         if result:
-            cursor.execute("""
-                UPDATE files
-                SET modified_date = ?
-                WHERE path = ?
-            """, (datetime.now().isoformat(), filepath))
-            self.db.conn.commit()
+            with self.db.write() as conn:
+                conn.execute("""
+                    UPDATE files
+                    SET modified_date = ?
+                    WHERE path = ?
+                """, (datetime.now().isoformat(), filepath))
     
     def _auto_organize(self, filepath, file_info):
         """Auto-organize file based on type"""
@@ -101,19 +117,8 @@ class FileOrganizerHandler(FileSystemEventHandler):
         # Determine category
         extension = file_info.get('extension', '').lower()
         
-        categories = {
-            'Documents': ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt'],
-            'Images': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.heic'],
-            'Videos': ['.mp4', '.mov', '.avi', '.mkv', '.wmv'],
-            'Music': ['.mp3', '.wav', '.flac', '.m4a', '.aac'],
-            'Archives': ['.zip', '.tar', '.gz', '.rar', '.7z'],
-            'Code': ['.py', '.js', '.html', '.css', '.java', '.cpp'],
-            'Spreadsheets': ['.xlsx', '.xls', '.csv', '.ods'],
-            'Presentations': ['.pptx', '.ppt', '.key', '.odp']
-        }
-        
         target_category = None
-        for category, extensions in categories.items():
+        for category, extensions in CATEGORIES.items():
             if extension in extensions:
                 target_category = category
                 break
@@ -139,13 +144,12 @@ class FileOrganizerHandler(FileSystemEventHandler):
                 print(f"   📁 Moved to: {target_category}/")
                 
                 # Update database
-                cursor = self.db.conn.cursor()
-                cursor.execute("""
-                    UPDATE files
-                    SET path = ?, folder_location = ?
-                    WHERE path = ?
-                """, (str(target_path), str(target_folder), filepath))
-                self.db.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("""
+                        UPDATE files
+                        SET path = ?, folder_location = ?
+                        WHERE path = ?
+                    """, (str(target_path), str(target_folder), filepath))
                 
             except Exception as e:
                 print(f"   ⚠️  Could not move file: {e}")
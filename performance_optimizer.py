@@ -251,37 +251,27 @@ class PerformanceOptimizer:
         from file_indexer import FileIndexer
         indexer = FileIndexer(self.db)
         
-        # Get all files first
-        all_files = []
-        for root, dirs, files in os.walk(folder_path):
-            # Skip hidden directories
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                if indexer.should_index_file(filepath):
-                    all_files.append(filepath)
+        # Get all files first (os.scandir walk; each file's stat is kept
+        # so indexing doesn't stat it again)
+        all_files = list(indexer.iter_indexable(folder_path))
         
         total = len(all_files)
         indexed = 0
+        processed = 0
         
         # Process in batches
         for i in range(0, total, batch_size):
             batch = all_files[i:i + batch_size]
             
-            for filepath in batch:
-                try:
-                    indexer.index_file(filepath)
-                    indexed += 1
-                except Exception as e:
-                    print(f"Error indexing {filepath}: {e}")
-            
-            # Commit after each batch
-            self.db.conn.commit()
+            # One transaction and one multi-row upsert per batch (errors
+            # are reported per file and counted as skipped)
+            added, skipped = indexer.index_entries(batch)
+            indexed += added
+            processed += len(batch)
             
             # Call progress callback
             if callback:
-                callback(indexed, total)
+                callback(processed, total)
             
             # Small delay between batches
             time.sleep(0.05)
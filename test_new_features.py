@@ -79,6 +79,71 @@ def test_database_schema():
         else:
             print(f"  ❌ Column 'files.{col}' missing")
     
+    db.close()
+    
+    # Upgrade an existing v1 database (large text columns in the middle
+    # of the files table) to the current schema
+    import sqlite3
+    import tempfile
+    from file_indexer import SCHEMA_VERSION, _FILES_COLUMN_NAMES
+    
+    db_path = os.path.join(tempfile.mkdtemp(), "v1.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT UNIQUE NOT NULL,
+            filename TEXT NOT NULL,
+            extension TEXT,
+            size INTEGER,
+            created_date TEXT,
+            modified_date TEXT,
+            last_indexed TEXT,
+            file_hash TEXT,
+            mime_type TEXT,
+            folder_location TEXT,
+            content_text TEXT,
+            ai_summary TEXT,
+            ai_tags TEXT,
+            project TEXT,
+            status TEXT DEFAULT 'active',
+            access_count INTEGER DEFAULT 0,
+            last_accessed TEXT,
+            is_duplicate INTEGER DEFAULT 0,
+            duplicate_of INTEGER,
+            ocr_text TEXT,
+            is_screenshot INTEGER DEFAULT 0,
+            hide_from_app INTEGER DEFAULT 0,
+            source TEXT DEFAULT 'filesystem',
+            source_id TEXT
+        );
+        INSERT INTO files (id, path, filename, content_text) VALUES (7, '/tmp/a/notes.txt', 'notes.txt', 'quarterly budget');
+        INSERT INTO files (id, path, filename, content_text) VALUES (42, '/tmp/b/plan.md', 'plan.md', 'launch plan');
+        PRAGMA user_version = 1;
+    """)
+    conn.commit()
+    conn.close()
+    
+    db = FileDatabase(db_path)
+    cursor = db.conn.cursor()
+    
+    cursor.execute("PRAGMA user_version")
+    assert cursor.fetchone()[0] == SCHEMA_VERSION == 2
+    print(f"  ✅ v1 database upgraded to schema version {SCHEMA_VERSION}")
+    
+    cursor.execute("SELECT id, path FROM files ORDER BY id")
+    assert cursor.fetchall() == [(7, '/tmp/a/notes.txt'), (42, '/tmp/b/plan.md')]
+    print("  ✅ File ids kept")
+    
+    cursor.execute("PRAGMA table_info(files)")
+    names = [row[1] for row in cursor.fetchall()]
+    assert names[:len(_FILES_COLUMN_NAMES)] == _FILES_COLUMN_NAMES
+    print("  ✅ Large text columns moved last")
+    
+    cursor.execute("INSERT INTO files_fts(files_fts) VALUES('integrity-check')")
+    assert [r['id'] for r in db.search_files('budget')] == [7]
+    print("  ✅ Full-text index rebuilt")
+    
     db.close()
     return True
 
@@ -8,7 +8,6 @@ import os
 import shutil
 import json
 from datetime import datetime, timedelta
-from pathlib import Path
 
 
 class TrashManager:
@@ -200,9 +199,13 @@ class TrashManager:
         cursor.execute("SELECT COUNT(*), SUM(LENGTH(metadata)) FROM trash")
         count, size = cursor.fetchone()
         
-        # Count files in trash directory
-        trash_files = list(Path(self.trash_dir).glob('*'))
-        trash_size = sum(f.stat().st_size for f in trash_files if f.is_file())
+        # Count files in trash directory (os.scandir: the file check comes
+        # from the listing, so each file costs one stat, for its size)
+        trash_size = 0
+        with os.scandir(self.trash_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith('.') and entry.is_file():
+                    trash_size += entry.stat().st_size
         
         return {
             'items_in_trash': count or 0,